@@ -2,14 +2,20 @@
 """photo-to-post - CLI para automatización de posts en Instagram."""
 
 import argparse
+import logging
+import os
 import sys
+from datetime import datetime, timezone
 
 from scripts.utils import (
     BASE_DIR,
+    PUBLISHED_DIR,
+    SCHEDULED_DIR,
     STAGE_DIRS,
     count_files,
     count_posts,
     ensure_folders,
+    read_json,
     setup_logging,
 )
 
@@ -29,24 +35,33 @@ def cmd_classify(args):
 
     results = classify_all()
     if results:
-        countries = {}
-        for r in results:
-            key = f"{r['country']}/{r['city']}"
-            countries[key] = countries.get(key, 0) + 1
+        from collections import Counter
+
+        counts = Counter((r["country"], r["city"]) for r in results)
         logger.info("Summary:")
-        for loc, n in sorted(countries.items()):
-            logger.info(f"  {loc}: {n} photos")
+        for (country, city), n in sorted(counts.items()):
+            logger.info(f"  {country}/{city}: {n} photos")
 
 
 def cmd_status(args):
     setup_logging()
+    try:
+        with os.scandir(BASE_DIR) as it:
+            stages = {e.name: e.path for e in it if e.name in STAGE_DIRS and e.is_dir()}
+    except FileNotFoundError:
+        stages = {}  # No base folder yet: every stage counts as 0
+
     print("\n=== photo-to-post Status ===\n")
-    print(f"  01_input:      {count_files(BASE_DIR / '01_input')} photos")
-    print(f"  02_classified: {count_files(BASE_DIR / '02_classified')} photos")
-    print(f"  03_drafts:     {count_posts(BASE_DIR / '03_drafts')} posts")
-    print(f"  04_approved:   {count_posts(BASE_DIR / '04_approved')} posts")
-    print(f"  05_scheduled:  {count_posts(BASE_DIR / '05_scheduled')} posts")
-    print(f"  06_published:  {count_posts(BASE_DIR / '06_published')} posts")
+    for name, counter, unit in (
+        ("01_input", count_files, "photos"),
+        ("02_classified", count_files, "photos"),
+        ("03_drafts", count_posts, "posts"),
+        ("04_approved", count_posts, "posts"),
+        ("05_scheduled", count_posts, "posts"),
+        ("06_published", count_posts, "posts"),
+    ):
+        n = counter(stages[name]) if name in stages else 0
+        print(f"  {name + ':':<15}{n} {unit}")
     print()
 
 
@@ -56,17 +71,18 @@ def cmd_create_posts(args):
 
     results = create_posts()
     if results:
-        logger.info("Drafts summary:")
-        for post in results:
-            n = len(post["photos"])
-            logger.info(f"  {post['id']} - {post['location_display']} ({n} photos)")
+        lines = ["Drafts summary:"]
+        lines.extend(
+            f"  {post['id']} - {post['location_display']} ({len(post['photos'])} photos)"
+            for post in results
+        )
+        logger.info("\n".join(lines))
         logger.info(f"\nReview drafts in 03_drafts/ or run: python run.py review")
 
 
 def cmd_review(args):
     logger = setup_logging()
     logger.info("Starting web interface at http://localhost:5000")
-    import sys
     sys.path.insert(0, str(BASE_DIR))
     from web.app import app
     app.run(debug=True, port=5000, use_reloader=False)
@@ -78,13 +94,14 @@ def cmd_schedule(args):
 
     results = schedule_posts()
     if results:
-        logger.info("Scheduled posts:")
+        lines = ["Scheduled posts:"]
         for post in results:
             sched = post.get("schedule", {})
-            logger.info(
+            lines.append(
                 f"  {post['id']} → {sched.get('suggested_date')} "
                 f"{sched.get('suggested_time')} ({post.get('location_display', '')})"
             )
+        logger.info("\n".join(lines))
         logger.info(f"\nView calendar: python run.py calendar")
 
 
@@ -97,7 +114,7 @@ def cmd_calendar(args):
         print("\nNo hay posts programados ni publicados.\n")
         return
 
-    print("\n=== Calendario de Publicaciones ===\n")
+    lines = ["\n=== Calendario de Publicaciones ===\n"]
     last_country = None
     consecutive = 0
     for date, entries in calendar.items():
@@ -106,19 +123,16 @@ def cmd_calendar(args):
             country = entry["country"]
 
             # Diversity warning
-            if country == last_country:
-                consecutive += 1
-            else:
-                consecutive = 1
-                last_country = country
-
+            consecutive = consecutive + 1 if country == last_country else 1
+            last_country = country
             warning = " [!] >3 mismo pais" if consecutive > 3 else ""
 
-            print(
+            lines.append(
                 f"  {status_icon} {date} {entry['time']}  "
                 f"{entry['location']} ({entry['photos']} fotos){warning}"
             )
-    print()
+    lines.append("")
+    print("\n".join(lines))
 
 
 def cmd_publish(args):
@@ -139,20 +153,84 @@ def cmd_publish(args):
         logger.error(f"Publication error: {e}")
 
 
+def _parse_schedule(date_str, time_str):
+    """Parse a "YYYY-MM-DD" date and "HH:MM" time into a naive datetime.
+
+    Schedules are normally written in this fixed shape, so slicing is tried
+    first; anything else (e.g. "7:00" typed in settings) goes through strptime.
+    Raises ValueError if neither accepts it, including a missing time.
+    """
+    if (
+        isinstance(time_str, str) and len(date_str) == 10 and len(time_str) == 5
+        and date_str[4] == date_str[7] == "-" and time_str[2] == ":"
+        and (date_str[:4] + date_str[5:7] + date_str[8:] + time_str[:2] + time_str[3:]).isdigit()
+    ):
+        return datetime(
+            int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]),
+            int(time_str[:2]), int(time_str[3:5]),
+        )
+    return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+
+
+def _iter_scheduled_posts(scheduled_dir):
+    """Yield (data, date, time, datetime) for each scheduled post, in folder order.
+
+    Posts are read one at a time so callers never hold the whole queue in memory.
+    Posts without a schedule are skipped; invalid schedules are logged and skipped.
+    """
+    logger = logging.getLogger("photo-to-post")
+
+    with os.scandir(scheduled_dir) as it:
+        names = sorted(e.name for e in it if e.is_dir(follow_symlinks=False))
+
+    for name in names:
+        post_json = os.path.join(scheduled_dir, name, "post.json")
+        if not os.path.isfile(post_json):
+            continue
+
+        data = read_json(post_json)
+
+        schedule = data.get("schedule", {})
+        sched_date = schedule.get("suggested_date")
+        sched_time = schedule.get("suggested_time", "00:00")
+
+        # Fallback to scheduled_at if suggested_date is null
+        if not sched_date and schedule.get("scheduled_at"):
+            scheduled_at = schedule["scheduled_at"]
+            sched_date = scheduled_at[:10]  # YYYY-MM-DD
+            sched_time = scheduled_at[11:16] if len(scheduled_at) > 16 else "00:00"  # HH:MM
+
+        if not sched_date:
+            continue
+
+        # Parse scheduled datetime
+        try:
+            sched_dt = _parse_schedule(sched_date, sched_time)
+        except ValueError:
+            logger.warning(f"Invalid schedule for {data['id']}: {sched_date} {sched_time}")
+            continue
+
+        yield data, sched_date, sched_time, sched_dt
+
+
 def cmd_auto_publish(args):
     """Auto-publish scheduled posts that are due."""
     logger = setup_logging()
-    from datetime import datetime, timezone
-    from pathlib import Path
-    import json
-    from scripts.publisher import publish_post
-    from scripts.utils import load_settings
 
-    scheduled_dir = BASE_DIR / "05_scheduled"
+    scheduled_dir = SCHEDULED_DIR
     if not scheduled_dir.exists():
         logger.info("No scheduled posts folder found.")
         return
 
+    # Nothing scheduled: stop before loading settings or the publisher
+    with os.scandir(scheduled_dir) as it:
+        if not any(e.is_dir(follow_symlinks=False) for e in it):
+            logger.info("No scheduled posts.")
+            return
+
+    from scripts.publisher import publish_post
+    from scripts.utils import load_settings
+
     # Get timezone from settings (default to UTC)
     settings = load_settings()
     tz_name = settings.get("timezone", "UTC")
@@ -177,39 +255,10 @@ def cmd_auto_publish(args):
     published_count = 0
     skipped_count = 0
     failed_count = 0
-    pending_posts = []  # Posts scheduled for the future
-
-    for post_dir in sorted(scheduled_dir.iterdir()):
-        if not post_dir.is_dir():
-            continue
-
-        post_json = post_dir / "post.json"
-        if not post_json.exists():
-            continue
-
-        with open(post_json, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        schedule = data.get("schedule", {})
-        sched_date = schedule.get("suggested_date")
-        sched_time = schedule.get("suggested_time", "00:00")
-
-        # Fallback to scheduled_at if suggested_date is null
-        if not sched_date and schedule.get("scheduled_at"):
-            scheduled_at = schedule["scheduled_at"]
-            sched_date = scheduled_at[:10]  # YYYY-MM-DD
-            sched_time = scheduled_at[11:16] if len(scheduled_at) > 16 else "00:00"  # HH:MM
-
-        if not sched_date:
-            continue
-
-        # Parse scheduled datetime
-        try:
-            sched_dt = datetime.strptime(f"{sched_date} {sched_time}", "%Y-%m-%d %H:%M")
-        except ValueError:
-            logger.warning(f"Invalid schedule for {data['id']}: {sched_date} {sched_time}")
-            continue
+    pending_count = 0
+    next_post = None  # Soonest post scheduled for the future
 
+    for data, sched_date, sched_time, sched_dt in _iter_scheduled_posts(scheduled_dir):
         # Check if it's time to publish
         if sched_dt <= now:
             # Check if too late
@@ -234,27 +283,25 @@ def cmd_auto_publish(args):
                 logger.error(f"Error publishing {data['id']}: {e}")
                 failed_count += 1
         else:
-            # Future post - track it
-            time_until = sched_dt - now
-            hours_until = time_until.total_seconds() / 3600
-            pending_posts.append({
-                "id": data["id"],
-                "country": data.get("country", "?"),
-                "scheduled": f"{sched_date} {sched_time}",
-                "hours_until": hours_until
-            })
+            # Future post - only keep the soonest one
+            pending_count += 1
+            if next_post is None or sched_dt < next_post["sched_dt"]:
+                next_post = {
+                    "country": data.get("country", "?"),
+                    "scheduled": f"{sched_date} {sched_time}",
+                    "sched_dt": sched_dt,
+                }
 
     # Summary
     logger.info(f"Auto-publish complete: {published_count} published, {failed_count} failed, {skipped_count} skipped")
 
     # Show next scheduled post
-    if pending_posts:
-        pending_posts.sort(key=lambda x: x["hours_until"])
-        next_post = pending_posts[0]
-        days = int(next_post["hours_until"] // 24)
-        hours = int(next_post["hours_until"] % 24)
+    if next_post:
+        hours_until = (next_post["sched_dt"] - now).total_seconds() / 3600
+        days = int(hours_until // 24)
+        hours = int(hours_until % 24)
         time_str = f"{days}d {hours}h" if days > 0 else f"{hours}h"
-        logger.info(f"Found {len(pending_posts)} pending posts")
+        logger.info(f"Found {pending_count} pending posts")
         logger.info(f"Next: {next_post['country']} at {next_post['scheduled']} (in {time_str})")
 
     # Exit with error if any publish failed, so GitHub Actions reports failure
@@ -291,8 +338,8 @@ def cmd_sync(args):
         logger.error(f"Git pull error: {e}")
         return
 
-    scheduled_dir = BASE_DIR / "05_scheduled"
-    published_dir = BASE_DIR / "06_published"
+    scheduled_dir = SCHEDULED_DIR
+    published_dir = PUBLISHED_DIR
 
     if not published_dir.exists():
         logger.info("No published folder found.")
@@ -301,29 +348,28 @@ def cmd_sync(args):
     synced = 0
 
     # Find published posts that have post.json but no photos folder
-    for year_dir in published_dir.iterdir():
-        if not year_dir.is_dir():
-            continue
-        for month_dir in year_dir.iterdir():
-            if not month_dir.is_dir():
-                continue
-            for post_dir in month_dir.iterdir():
-                if not post_dir.is_dir():
-                    continue
-
-                photos_dir = post_dir / "photos"
-                post_json = post_dir / "post.json"
+    with os.scandir(published_dir) as years:
+        year_paths = [e.path for e in years if e.is_dir()]
+    for year_path in year_paths:
+        with os.scandir(year_path) as months:
+            month_paths = [e.path for e in months if e.is_dir()]
+        for month_path in month_paths:
+            with os.scandir(month_path) as posts:
+                post_entries = [e for e in posts if e.is_dir()]
+            for post_entry in post_entries:
+                post_json = os.path.join(post_entry.path, "post.json")
+                photos_path = os.path.join(post_entry.path, "photos")
 
                 # If has post.json but no photos, look for them in scheduled
-                if post_json.exists() and not photos_dir.exists():
+                if os.path.isfile(post_json) and not os.path.exists(photos_path):
                     # Find matching folder in scheduled
-                    scheduled_post = scheduled_dir / post_dir.name
+                    scheduled_post = scheduled_dir / post_entry.name
                     scheduled_photos = scheduled_post / "photos"
 
                     if scheduled_photos.exists():
                         # Move photos to published
-                        shutil.move(str(scheduled_photos), str(photos_dir))
-                        logger.info(f"Synced photos: {post_dir.name}")
+                        shutil.move(str(scheduled_photos), photos_path)
+                        logger.info(f"Synced photos: {post_entry.name}")
                         synced += 1
 
                         # Remove empty scheduled folder
@@ -345,39 +391,30 @@ def main():
     )
     sub = parser.add_subparsers(dest="command", help="Comando a ejecutar")
 
-    sub.add_parser("init", help="Crear estructura de carpetas y configuración")
-    sub.add_parser("classify", help="Clasificar fotos de 01_input por ubicación")
-    sub.add_parser("create-posts", help="Crear borradores de posts")
-    sub.add_parser("status", help="Ver estado actual del sistema")
-    sub.add_parser("review", help="Abrir interfaz web para revisar posts")
-    sub.add_parser("schedule", help="Programar posts aprobados")
-    sub.add_parser("calendar", help="Ver calendario de publicaciones")
+    sub.add_parser("init", help="Crear estructura de carpetas y configuración").set_defaults(func=cmd_init)
+    sub.add_parser("classify", help="Clasificar fotos de 01_input por ubicación").set_defaults(func=cmd_classify)
+    sub.add_parser("create-posts", help="Crear borradores de posts").set_defaults(func=cmd_create_posts)
+    sub.add_parser("status", help="Ver estado actual del sistema").set_defaults(func=cmd_status)
+    sub.add_parser("review", help="Abrir interfaz web para revisar posts").set_defaults(func=cmd_review)
+    sub.add_parser("schedule", help="Programar posts aprobados").set_defaults(func=cmd_schedule)
+    sub.add_parser("calendar", help="Ver calendario de publicaciones").set_defaults(func=cmd_calendar)
 
     pub = sub.add_parser("publish", help="Publicar un post manualmente")
     pub.add_argument("--post-id", required=True, help="ID del post a publicar")
+    pub.set_defaults(func=cmd_publish)
 
     auto = sub.add_parser("auto-publish", help="Publicar automaticamente posts programados que ya toca")
     auto.add_argument("--max-delay", type=int, default=24, help="Max horas de retraso permitido (default: 24)")
+    auto.set_defaults(func=cmd_auto_publish)
 
-    sub.add_parser("sync", help="Sincronizar fotos locales con estado de GitHub (despues de git pull)")
+    sub.add_parser(
+        "sync", help="Sincronizar fotos locales con estado de GitHub (despues de git pull)"
+    ).set_defaults(func=cmd_sync)
 
     args = parser.parse_args()
 
-    commands = {
-        "init": cmd_init,
-        "classify": cmd_classify,
-        "create-posts": cmd_create_posts,
-        "status": cmd_status,
-        "review": cmd_review,
-        "schedule": cmd_schedule,
-        "calendar": cmd_calendar,
-        "publish": cmd_publish,
-        "auto-publish": cmd_auto_publish,
-        "sync": cmd_sync,
-    }
-
-    if args.command in commands:
-        commands[args.command](args)
+    if getattr(args, "func", None):
+        args.func(args)
     else:
         parser.print_help()
         sys.exit(1)
@@ -1,25 +1,104 @@
 """Caption generator - uses Claude API to generate Instagram captions."""
 
-import json
+import asyncio
+import functools
 import logging
 import os
+import re
 
-from scripts.utils import load_settings
+from scripts.utils import load_credentials, load_settings
 
 logger = logging.getLogger("photo-to-post")
 
+PROMPT_TEMPLATE = (
+    "Eres un fotógrafo de viajes que comparte sus fotos en Instagram.\n\n"
+    "Genera un caption para un post de fotos de paisajes y viaje.\n\n"
+    "Lugar: {city}, {country}\n"
+    "Fotos en el carrusel: {photo_count}\n"
+    "{date_line}"
+    "{context_line}"
+    "\nReglas:\n"
+    "- 2-4 oraciones\n"
+    "- Primera oración: algo personal, una reflexión o sensación del momento\n"
+    "- Después: un dato interesante, contexto del lugar o algo que lo haga único\n"
+    "- Tono: cercano pero informativo, como contándole a un amigo\n"
+    "- 1-2 emojis máximo, no al inicio\n"
+    "- No uses frases cliché (\"no hay palabras\", \"foto no le hace justicia\", \"un lugar mágico\")\n"
+    "- No uses exclamaciones excesivas\n"
+    "- Idioma: español\n"
+    "- Al final del caption, agrega exactamente 3 hashtags relevantes al lugar y contenido específico de las fotos, todos en minúsculas\n"
+    "\nResponde SOLO con el texto del caption seguido de los 3 hashtags. Sin comillas."
+)
+
+# Run of whitespace-separated hashtags at the very end of the response
+_HASHTAG_TAIL_RE = re.compile(r"(?:^|(?<=\s))(?:#\S+(?:\s+|\Z))+\Z")
+
+# Max concurrent Claude requests and retries per caption when batching
+BATCH_CONCURRENCY = 8
+MAX_RETRIES = 4
+HTTP_TIMEOUT = 60.0
+
 
 def _get_api_key():
     key = os.environ.get("ANTHROPIC_API_KEY")
     if key:
         return key
-    creds_path = "D:/photo-to-post/config/credentials.json"
-    try:
-        with open(creds_path, "r", encoding="utf-8") as f:
-            creds = json.load(f)
-        return creds.get("anthropic_api_key")
-    except FileNotFoundError:
-        return None
+    return load_credentials().get("anthropic_api_key")
+
+
+def _http_options():
+    """Connection pool settings shared by the sync and async Anthropic clients."""
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_keepalive_connections=BATCH_CONCURRENCY,
+            max_connections=2 * BATCH_CONCURRENCY,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT),
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client(api_key):
+    """Return a shared Anthropic client so batches reuse one connection pool.
+
+    Keyed by api_key, so a key changed while the web app is running gets a new client.
+    """
+    import anthropic
+    import httpx
+
+    return anthropic.Anthropic(
+        api_key=api_key,
+        http_client=httpx.Client(**_http_options()),
+    )
+
+
+def _build_prompt(country, city, photo_count, date_taken=None, context=None):
+    """Build the caption prompt sent to Claude."""
+    return PROMPT_TEMPLATE.format_map({
+        "country": country,
+        "city": city,
+        "photo_count": photo_count,
+        "date_line": f"Fecha de las fotos: {date_taken}\n" if date_taken else "",
+        "context_line": f"Contexto adicional: {context}\n" if context else "",
+    })
+
+
+def _split_caption(raw):
+    """Separate caption text from the AI-generated hashtags at its end.
+
+    Returns a tuple (caption_text, ai_hashtags). Hashtags used inside the
+    caption text are left in place.
+    """
+    match = _HASHTAG_TAIL_RE.search(raw)
+    if not match:
+        return raw, []
+    return raw[:match.start()].rstrip(), match.group().split()
+
+
+def _get_model():
+    return load_settings().get("apis", {}).get("anthropic_model", "claude-sonnet-4-20250514")
 
 
 def generate_caption(country, city, photo_count, date_taken=None, context=None):
@@ -36,65 +115,23 @@ def generate_caption(country, city, photo_count, date_taken=None, context=None):
     Falls back to a template if API key is not configured.
     """
     api_key = _get_api_key()
-    settings = load_settings()
-    style = settings.get("caption_style", {})
 
     if not api_key:
         logger.warning("No Anthropic API key found. Using template caption.")
         return _template_caption(country, city, photo_count), []
 
     try:
-        import anthropic
-
-        client = anthropic.Anthropic(api_key=api_key)
+        client = _get_client(api_key)
+        prompt = _build_prompt(country, city, photo_count, date_taken, context)
 
-        prompt = (
-            f"Eres un fotógrafo de viajes que comparte sus fotos en Instagram.\n\n"
-            f"Genera un caption para un post de fotos de paisajes y viaje.\n\n"
-            f"Lugar: {city}, {country}\n"
-            f"Fotos en el carrusel: {photo_count}\n"
-        )
-
-        if date_taken:
-            prompt += f"Fecha de las fotos: {date_taken}\n"
-
-        if context:
-            prompt += f"Contexto adicional: {context}\n"
-
-        prompt += (
-            f"\nReglas:\n"
-            f"- 2-4 oraciones\n"
-            f"- Primera oración: algo personal, una reflexión o sensación del momento\n"
-            f"- Después: un dato interesante, contexto del lugar o algo que lo haga único\n"
-            f"- Tono: cercano pero informativo, como contándole a un amigo\n"
-            f"- 1-2 emojis máximo, no al inicio\n"
-            f"- No uses frases cliché (\"no hay palabras\", \"foto no le hace justicia\", \"un lugar mágico\")\n"
-            f"- No uses exclamaciones excesivas\n"
-            f"- Idioma: español\n"
-            f"- Al final del caption, agrega exactamente 3 hashtags relevantes al lugar y contenido específico de las fotos, todos en minúsculas\n"
-            f"\nResponde SOLO con el texto del caption seguido de los 3 hashtags. Sin comillas."
-        )
-
-        model = settings.get("apis", {}).get("anthropic_model", "claude-sonnet-4-20250514")
         message = client.messages.create(
-            model=model,
+            model=_get_model(),
             max_tokens=300,
             messages=[{"role": "user", "content": prompt}],
         )
         raw = message.content[0].text.strip()
 
-        # Separate caption text from AI-generated hashtags
-        lines = raw.split("\n")
-        caption_lines = []
-        ai_hashtags = []
-        for line in lines:
-            tags_in_line = [w for w in line.split() if w.startswith("#")]
-            if tags_in_line and len(tags_in_line) == len(line.split()):
-                ai_hashtags.extend(tags_in_line)
-            else:
-                caption_lines.append(line)
-
-        caption = "\n".join(caption_lines).strip()
+        caption, ai_hashtags = _split_caption(raw)
         logger.info(f"Caption generated via Claude API for {city}, {country}")
         return caption, ai_hashtags
 
@@ -103,6 +140,70 @@ def generate_caption(country, city, photo_count, date_taken=None, context=None):
         return _template_caption(country, city, photo_count), []
 
 
+async def agenerate_caption(client, semaphore, country, city, photo_count, date_taken=None, context=None):
+    """Async version of generate_caption using a shared AsyncAnthropic client.
+
+    At most BATCH_CONCURRENCY requests run at once (bounded by `semaphore`).
+    Rate limits, connection errors and 5xx responses are retried by the client.
+    """
+    prompt = _build_prompt(country, city, photo_count, date_taken, context)
+
+    try:
+        async with semaphore:
+            message = await client.messages.create(
+                model=_get_model(),
+                max_tokens=300,
+                messages=[{"role": "user", "content": prompt}],
+            )
+
+        raw = message.content[0].text.strip()
+        caption, ai_hashtags = _split_caption(raw)
+        logger.info(f"Caption generated via Claude API for {city}, {country}")
+        return caption, ai_hashtags
+
+    except Exception as e:
+        logger.warning(f"Claude API error: {e}. Using template caption.")
+        return _template_caption(country, city, photo_count), []
+
+
+async def generate_captions_batch(jobs):
+    """Generate captions for many posts concurrently.
+
+    Args:
+        jobs: List of dicts with generate_caption keyword arguments
+              (country, city, photo_count and optionally date_taken, context).
+
+    Returns a list of (caption_text, ai_hashtags) tuples in the same order as jobs.
+    """
+    if not jobs:
+        return []
+
+    api_key = _get_api_key()
+    if not api_key:
+        logger.warning("No Anthropic API key found. Using template captions.")
+        return [(_template_caption(j["country"], j["city"], j["photo_count"]), []) for j in jobs]
+
+    try:
+        import anthropic
+    except ImportError as e:
+        logger.warning(f"Claude API error: {e}. Using template captions.")
+        return [(_template_caption(j["country"], j["city"], j["photo_count"]), []) for j in jobs]
+
+    # The async client is bound to the running event loop, so it lives only
+    # for this batch rather than being cached at module level.
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    import httpx
+
+    async with anthropic.AsyncAnthropic(
+        api_key=api_key,
+        max_retries=MAX_RETRIES,
+        http_client=httpx.AsyncClient(**_http_options()),
+    ) as client:
+        return await asyncio.gather(
+            *(agenerate_caption(client, semaphore, **job) for job in jobs)
+        )
+
+
 def _template_caption(country, city, photo_count):
     """Fallback template when API is not available."""
     if country == "_unknown" or city == "_unknown":
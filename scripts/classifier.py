@@ -1,49 +1,101 @@
 import base64
+import binascii
+import functools
+import io
 import json
 import logging
+import os
 import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-import requests
+import exifread
 from PIL import Image
-from PIL.ExifTags import GPSTAGS, TAGS
 
-from scripts.utils import BASE_DIR, load_settings
+from scripts.utils import (
+    BASE_DIR,
+    CLASSIFIED_DIR,
+    INPUT_DIR,
+    get_http_session,
+    iter_images,
+    load_credentials,
+    load_settings,
+    read_json,
+)
 
 logger = logging.getLogger("photo-to-post")
+# exifread warns about every file without EXIF (e.g. most PNGs)
+logging.getLogger("exifread").setLevel(logging.ERROR)
 
 # Vision classification with Claude Haiku
 VISION_MODEL = "claude-3-5-haiku-20241022"
+VISION_MAX_SIZE = 1024  # Longest edge sent to the model, in px
+VISION_JPEG_QUALITY = 75
 
-INPUT_DIR = BASE_DIR / "01_input"
-CLASSIFIED_DIR = BASE_DIR / "02_classified"
 
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+# Public Nominatim allows 1 req/s. For large imports, point NOMINATIM_URL at a
+# self-hosted instance (e.g. http://localhost:8080/reverse) to skip the limit.
+_PUBLIC_NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+NOMINATIM_URL = os.environ.get("NOMINATIM_URL", _PUBLIC_NOMINATIM_URL)
+NOMINATIM_MIN_INTERVAL = 1.0 if NOMINATIM_URL == _PUBLIC_NOMINATIM_URL else 0.0
 USER_AGENT = "photo-to-post/1.0"
 
+# Reverse-geocode results keyed by ~1 km grid cell, persisted across runs
+GEOCODE_CACHE_FILE = BASE_DIR / "cache" / "geocode.json"
+GEOCODE_PRECISION = 2
 
-def _get_exif_data(filepath):
+# Photos located concurrently by classify_all (EXIF reads and vision calls;
+# Nominatim requests are still serialized by reverse_geocode)
+CLASSIFY_WORKERS = 8
+
+
+# Only these EXIF tags are used; exifread key -> key in our dict
+_EXIF_TAGS = {
+    "EXIF DateTimeOriginal": "DateTimeOriginal",
+    "Image DateTime": "DateTime",
+    "GPS GPSLatitude": "GPSLatitude",
+    "GPS GPSLatitudeRef": "GPSLatitudeRef",
+    "GPS GPSLongitude": "GPSLongitude",
+    "GPS GPSLongitudeRef": "GPSLongitudeRef",
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _read_exif(path, mtime_ns):
+    # exifread only walks the EXIF IFDs: no image decode, and with
+    # details=False no MakerNote or thumbnail parsing
     try:
-        img = Image.open(filepath)
-        exif = img._getexif()
-        if not exif:
-            return {}
-        return {TAGS.get(k, k): v for k, v in exif.items()}
+        with open(path, "rb") as f:
+            tags = exifread.process_file(
+                f, stop_tag="GPSLongitude", details=False, extract_thumbnail=False
+            )
     except Exception:
         return {}
+    exif = {}
+    for src, dst in _EXIF_TAGS.items():
+        tag = tags.get(src)
+        if tag is None:
+            continue
+        values = tag.values
+        exif[dst] = tuple(values) if isinstance(values, list) else str(values).strip()
+    return exif
 
 
-def _get_gps_info(exif_data):
-    gps_info = exif_data.get("GPSInfo")
-    if not gps_info:
-        return None
-    parsed = {}
-    for key, val in gps_info.items():
-        tag = GPSTAGS.get(key, key)
-        parsed[tag] = val
-    return parsed
+def _get_exif_data(filepath):
+    """Return the EXIF tags we use, cached per (path, mtime).
+
+    The same photo is read during classification, draft scanning and
+    draft creation; the cache makes every read after the first free.
+    The returned dict is shared and must not be mutated.
+    """
+    try:
+        mtime_ns = os.stat(filepath).st_mtime_ns
+    except OSError:
+        return {}
+    return _read_exif(str(filepath), mtime_ns)
 
 
 def _convert_to_degrees(value):
@@ -51,30 +103,49 @@ def _convert_to_degrees(value):
     return float(d) + float(m) / 60.0 + float(s) / 3600.0
 
 
-def read_gps(filepath):
-    exif = _get_exif_data(filepath)
-    gps = _get_gps_info(exif)
-    if not gps:
+def read_gps(filepath, exif=None):
+    """Return {"lat", "lon"} from the photo's EXIF, or None.
+
+    Pass an already parsed `exif` dict to avoid re-reading the file.
+    """
+    if exif is None:
+        exif = _get_exif_data(filepath)
+    if "GPSLatitude" not in exif or "GPSLongitude" not in exif:
         return None
 
     try:
-        lat = _convert_to_degrees(gps["GPSLatitude"])
-        if gps.get("GPSLatitudeRef", "N") == "S":
+        lat = _convert_to_degrees(exif["GPSLatitude"])
+        if exif.get("GPSLatitudeRef", "N") == "S":
             lat = -lat
-        lon = _convert_to_degrees(gps["GPSLongitude"])
-        if gps.get("GPSLongitudeRef", "E") == "W":
+        lon = _convert_to_degrees(exif["GPSLongitude"])
+        if exif.get("GPSLongitudeRef", "E") == "W":
             lon = -lon
         return {"lat": lat, "lon": lon}
-    except (KeyError, TypeError, ZeroDivisionError):
+    except (TypeError, ValueError, ZeroDivisionError):
         return None
 
 
-def get_date_taken(filepath):
-    exif = _get_exif_data(filepath)
+def _parse_exif_datetime(s):
+    """Parse a fixed-width EXIF "YYYY:MM:DD HH:MM:SS" string (much faster than strptime)."""
+    if len(s) == 19 and s[4] == s[7] == ":" and s[10] == " " and s[13] == s[16] == ":":
+        return datetime(
+            int(s[0:4]), int(s[5:7]), int(s[8:10]),
+            int(s[11:13]), int(s[14:16]), int(s[17:19]),
+        )
+    return datetime.strptime(s, "%Y:%m:%d %H:%M:%S")
+
+
+def get_date_taken(filepath, exif=None):
+    """Return when the photo was taken, falling back to the file mtime.
+
+    Pass an already parsed `exif` dict to avoid re-reading the file.
+    """
+    if exif is None:
+        exif = _get_exif_data(filepath)
     date_str = exif.get("DateTimeOriginal") or exif.get("DateTime")
     if date_str:
         try:
-            return datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
+            return _parse_exif_datetime(date_str)
         except ValueError:
             pass
     stat = filepath.stat()
@@ -83,13 +154,54 @@ def get_date_taken(filepath):
 
 def _get_anthropic_key():
     """Get Anthropic API key from credentials."""
-    creds_path = BASE_DIR / "config" / "credentials.json"
+    return load_credentials().get("anthropic_api_key")
+
+
+# Multiple of 3 so each base64 chunk encodes without padding
+_B64_CHUNK = 57 * 1024
+
+
+def _encode_image(filepath):
+    """Base64-encode a file in chunks instead of loading it whole first."""
+    out = bytearray()
+    with open(filepath, "rb") as f:
+        while chunk := f.read(_B64_CHUNK):
+            out += binascii.b2a_base64(chunk, newline=False)
+    return out.decode("ascii")
+
+
+def _prepare_vision_payload(filepath):
+    """Return (media_type, base64_data) for a small JPEG copy of the photo.
+
+    Landmarks and scenery are recognizable at VISION_MAX_SIZE px, so sending
+    the full export only adds tokens and latency. Falls back to the original
+    file if PIL cannot process it.
+    """
     try:
-        with open(creds_path, "r", encoding="utf-8") as f:
-            creds = json.load(f)
-        return creds.get("anthropic_api_key")
-    except FileNotFoundError:
-        return None
+        with Image.open(filepath) as img:
+            img.thumbnail((VISION_MAX_SIZE, VISION_MAX_SIZE), Image.LANCZOS)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=VISION_JPEG_QUALITY)
+        return "image/jpeg", base64.b64encode(buf.getbuffer()).decode("ascii")
+    except Exception as e:
+        logger.warning(f"Could not downscale {Path(filepath).name} for vision: {e}")
+
+    media_type = {
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+        ".png": "image/png",
+    }.get(Path(filepath).suffix.lower(), "image/jpeg")
+    return media_type, _encode_image(filepath)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_vision_client(api_key):
+    """Return a shared Anthropic client (imported lazily, created once per key)."""
+    import anthropic
+
+    return anthropic.Anthropic(api_key=api_key)
 
 
 def classify_with_vision(filepath):
@@ -103,23 +215,11 @@ def classify_with_vision(filepath):
         return None, None
 
     try:
-        # Read and encode image
-        with open(filepath, "rb") as f:
-            image_data = base64.standard_b64encode(f.read()).decode("utf-8")
-
-        # Determine media type
-        suffix = Path(filepath).suffix.lower()
-        media_type = {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-        }.get(suffix, "image/jpeg")
+        # Downscale and encode image
+        media_type, image_data = _prepare_vision_payload(filepath)
 
         # Call Claude Vision
-        import anthropic
-        client = anthropic.Anthropic(api_key=api_key)
-
-        message = client.messages.create(
+        message = _get_vision_client(api_key).messages.create(
             model=VISION_MODEL,
             max_tokens=256,
             messages=[
@@ -187,9 +287,61 @@ Respond in Spanish for country/city names when possible."""
         return None, None
 
 
+_geocode_cache = None
+_geocode_lock = threading.Lock()
+_last_geocode_request = 0.0
+
+
+def _load_geocode_cache():
+    global _geocode_cache
+    if _geocode_cache is None:
+        try:
+            _geocode_cache = read_json(GEOCODE_CACHE_FILE)
+        except (OSError, ValueError):
+            _geocode_cache = {}
+    return _geocode_cache
+
+
+def _save_geocode_cache():
+    try:
+        GEOCODE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = GEOCODE_CACHE_FILE.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(_geocode_cache, ensure_ascii=False))
+        os.replace(tmp, GEOCODE_CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"Could not save geocode cache: {e}")
+
+
 def reverse_geocode(lat, lon):
+    """Return (country, city) for a coordinate.
+
+    Nominatim is queried with the exact coordinate, but results are cached
+    on disk per ~1 km cell, so photos from the same place share one request.
+    Requests to the public server are spaced NOMINATIM_MIN_INTERVAL apart.
+    Thread-safe: concurrent callers queue for the server one at a time.
+    """
+    key = f"{round(lat, GEOCODE_PRECISION)},{round(lon, GEOCODE_PRECISION)}"
+    with _geocode_lock:
+        cache = _load_geocode_cache()
+        if key not in cache:
+            result = _request_geocode(lat, lon)
+            if result is None:
+                return "_unknown", "_unknown"
+            cache[key] = list(result)
+            _save_geocode_cache()
+        return tuple(cache[key])
+
+
+def _request_geocode(lat, lon):
+    """Query Nominatim for (country, city), or None on failure. Caller holds _geocode_lock."""
+    global _last_geocode_request
+
+    wait = _last_geocode_request + NOMINATIM_MIN_INTERVAL - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
     try:
-        resp = requests.get(
+        resp = get_http_session().get(
             NOMINATIM_URL,
             params={"lat": lat, "lon": lon, "format": "json", "zoom": 10},
             headers={"User-Agent": USER_AGENT},
@@ -197,45 +349,49 @@ def reverse_geocode(lat, lon):
         )
         resp.raise_for_status()
         data = resp.json()
-        addr = data.get("address", {})
-        country = addr.get("country", "_unknown")
-        city = (
-            addr.get("city")
-            or addr.get("town")
-            or addr.get("village")
-            or addr.get("municipality")
-            or addr.get("state")
-            or "_unknown"
-        )
-        return country, city
     except Exception as e:
         logger.warning(f"Geocoding failed for ({lat}, {lon}): {e}")
-        return "_unknown", "_unknown"
-
-
-def classify_photo(filepath):
-    filepath = Path(filepath)
-    gps = read_gps(filepath)
-    date_taken = get_date_taken(filepath)
-    date_str = date_taken.strftime("%Y%m%d")
+        return None
+    finally:
+        _last_geocode_request = time.monotonic()
+
+    addr = data.get("address", {})
+    country = addr.get("country", "_unknown")
+    city = (
+        addr.get("city")
+        or addr.get("town")
+        or addr.get("village")
+        or addr.get("municipality")
+        or addr.get("state")
+        or "_unknown"
+    )
+    return country, city
+
+
+def _locate_photo(filepath):
+    """Work out where a photo belongs without touching the file.
+
+    Returns (country, city, method, date_str). Safe to call from worker threads.
+    """
+    exif = _get_exif_data(filepath)
+    gps = read_gps(filepath, exif)
+    date_str = get_date_taken(filepath, exif).strftime("%Y%m%d")
 
     if gps:
         country, city = reverse_geocode(gps["lat"], gps["lon"])
-        classification_method = "GPS"
-        # Rate limit for Nominatim
-        time.sleep(1)
-    else:
-        # Try vision classification
-        logger.info(f"No GPS data for {filepath.name}, trying vision classification...")
-        country, city = classify_with_vision(filepath)
-
-        if country and city:
-            classification_method = "Vision"
-        else:
-            logger.warning(f"Could not classify {filepath.name}, moving to _manual")
-            country, city = "_manual", "_manual"
-            classification_method = "Manual"
+        return country, city, "GPS", date_str
+
+    # Try vision classification
+    logger.info(f"No GPS data for {filepath.name}, trying vision classification...")
+    country, city = classify_with_vision(filepath)
+    if country and city:
+        return country, city, "Vision", date_str
+
+    logger.warning(f"Could not classify {filepath.name}, moving to _manual")
+    return "_manual", "_manual", "Manual", date_str
 
+
+def _move_classified(filepath, country, city, classification_method, date_str):
     dest_dir = CLASSIFIED_DIR / country / city
     dest_dir.mkdir(parents=True, exist_ok=True)
 
@@ -250,28 +406,35 @@ def classify_photo(filepath):
             dest_path = dest_dir / f"{stem}_{i}{suffix}"
             i += 1
 
-    shutil.move(str(filepath), str(dest_path))
+    try:
+        # Same filesystem (the normal case): a plain rename, no copy fallback
+        os.rename(filepath, dest_path)
+    except OSError:
+        shutil.move(str(filepath), str(dest_path))
     logger.info(f"Classified: {filepath.name} → {country}/{city}/{dest_path.name} ({classification_method})")
     return {"country": country, "city": city, "path": str(dest_path), "method": classification_method}
 
 
+def classify_photo(filepath):
+    filepath = Path(filepath)
+    return _move_classified(filepath, *_locate_photo(filepath))
+
+
 def classify_all():
     INPUT_DIR.mkdir(parents=True, exist_ok=True)
-    files = [
-        f
-        for f in INPUT_DIR.iterdir()
-        if f.is_file() and f.suffix.lower() in (".jpg", ".jpeg", ".png", ".tiff")
-    ]
+    files = sorted(Path(entry.path) for entry in iter_images(INPUT_DIR))
 
     if not files:
         logger.info("No photos found in 01_input/")
         return []
 
     logger.info(f"Found {len(files)} photos to classify")
-    results = []
-    for f in sorted(files):
-        result = classify_photo(f)
-        results.append(result)
+
+    # Locate photos concurrently, then move them here in input order so
+    # name collisions in 02_classified resolve deterministically
+    with ThreadPoolExecutor(max_workers=min(CLASSIFY_WORKERS, len(files))) as ex:
+        locations = list(ex.map(_locate_photo, files))
+    results = [_move_classified(f, *loc) for f, loc in zip(files, locations)]
 
     logger.info(f"Classification complete: {len(results)} photos processed")
     return results
@@ -1,21 +1,25 @@
 """Post creator - groups classified photos into carousel drafts."""
 
-import json
+import asyncio
+import itertools
 import logging
+import os
 import random
 import shutil
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-from scripts.caption_generator import generate_caption
-from scripts.classifier import get_date_taken, read_gps
-from scripts.utils import BASE_DIR, load_hashtags, load_settings
+from scripts.caption_generator import generate_captions_batch
+from scripts.classifier import _get_exif_data, get_date_taken, read_gps
+from scripts.utils import CLASSIFIED_DIR, DRAFTS_DIR, iter_images, load_hashtags, load_settings, write_json
 
 logger = logging.getLogger("photo-to-post")
 
-CLASSIFIED_DIR = BASE_DIR / "02_classified"
-DRAFTS_DIR = BASE_DIR / "03_drafts"
+
+# Parallel EXIF reads when scanning 02_classified
+EXIF_WORKERS = 8
 
 
 def _scan_classified():
@@ -24,20 +28,26 @@ def _scan_classified():
     if not CLASSIFIED_DIR.exists():
         return groups
 
-    for photo in CLASSIFIED_DIR.rglob("*"):
-        if not photo.is_file() or photo.suffix.lower() not in (".jpg", ".jpeg", ".png", ".tiff"):
-            continue
+    candidates = []
+    for entry in iter_images(CLASSIFIED_DIR, recursive=True):
+        photo = Path(entry.path)
         # Path structure: 02_classified/{country}/{city}/{file}
-        rel = photo.relative_to(CLASSIFIED_DIR)
-        parts = rel.parts
+        parts = photo.relative_to(CLASSIFIED_DIR).parts
         if len(parts) < 3:
             continue
-        country, city = parts[0], parts[1]
-        date_taken = get_date_taken(photo)
-        groups[(country, city)].append({
-            "path": photo,
-            "date": date_taken,
-        })
+        candidates.append((photo, parts[0], parts[1]))
+    if not candidates:
+        return groups
+
+    # EXIF reads are disk-bound, so read all candidates at once on a pool
+    with ThreadPoolExecutor(max_workers=min(EXIF_WORKERS, len(candidates))) as ex:
+        exifs = ex.map(_get_exif_data, [photo for photo, _, _ in candidates])
+        for (photo, country, city), exif in zip(candidates, exifs):
+            groups[(country, city)].append({
+                "path": photo,
+                "date": get_date_taken(photo, exif),
+                "exif": exif,
+            })
 
     # Sort photos within each group by date
     for key in groups:
@@ -97,33 +107,48 @@ def _split_into_posts(photos, min_photos, max_photos):
 
 
 def _select_hashtags(country, city, ai_hashtags=None):
-    """Select hashtags: AI-generated + base + country from JSON."""
+    """Select hashtags: AI-generated + base + country from JSON.
+
+    Duplicates (ignoring case) are dropped, keeping the first occurrence.
+    """
     ht = load_hashtags()
     counts = ht.get("hashtags_per_post", {})
 
     selected = []
+    seen = set()
+
+    def add(tags):
+        for tag in tags:
+            key = tag.lower()
+            if key not in seen:
+                seen.add(key)
+                selected.append(tag)
 
     # AI-generated hashtags (specific to the content)
     if ai_hashtags:
-        selected.extend(ai_hashtags)
+        add(ai_hashtags)
 
     # Base hashtags
     base = ht.get("base", [])
     n_base = min(counts.get("base", 3), len(base))
-    selected.extend(random.sample(base, n_base))
+    add(random.sample(base, n_base))
 
     # Country hashtags
     country_tags = ht.get("by_country", {}).get(country, [])
     n_country = min(counts.get("country", 2), len(country_tags))
     if country_tags:
-        selected.extend(random.sample(country_tags, n_country))
+        add(random.sample(country_tags, n_country))
 
     return selected
 
 
+# Sequence suffix so IDs created within the same second stay unique
+_POST_SEQ = itertools.count(1)
+
+
 def _generate_post_id():
     now = datetime.now()
-    return f"post_{now.strftime('%Y%m%d')}_{now.strftime('%H%M%S')}"
+    return f"post_{now.strftime('%Y%m%d_%H%M%S')}_{next(_POST_SEQ):03d}"
 
 
 def create_posts():
@@ -155,84 +180,92 @@ def create_posts():
         logger.info("No hay ubicaciones con suficientes fotos para crear posts")
         return []
 
+    # Split every location into carousels first so captions can be generated concurrently
+    jobs = []
+    for (country, city), photos in groups.items():
+        for batch in _split_into_posts(photos, min_photos, max_photos):
+            jobs.append((country, city, batch))
+
+    # Generate captions + AI hashtags
+    captions = asyncio.run(generate_captions_batch([
+        {
+            "country": country,
+            "city": city,
+            "photo_count": len(batch),
+            "date_taken": batch[0]["date"].strftime("%Y-%m-%d"),
+        }
+        for country, city, batch in jobs
+    ]))
+
     created = []
 
-    for (country, city), photos in groups.items():
-        post_batches = _split_into_posts(photos, min_photos, max_photos)
-
-        for batch in post_batches:
-            post_id = _generate_post_id()
-            draft_dir = DRAFTS_DIR / f"draft_{post_id}"
-            photos_dir = draft_dir / "photos"
-            photos_dir.mkdir(parents=True, exist_ok=True)
-
-            # Copy photos into draft
-            photo_entries = []
-            for i, p in enumerate(batch, 1):
-                ext = p["path"].suffix
-                dest_name = f"{i:02d}{ext}"
-                dest_path = photos_dir / dest_name
-                shutil.copy2(str(p["path"]), str(dest_path))
-
-                gps = read_gps(p["path"])
-                photo_entries.append({
-                    "filename": dest_name,
-                    "original_name": p["path"].name,
-                    "gps": gps,
-                    "taken_at": p["date"].isoformat(),
-                })
-
-            # Generate caption + AI hashtags
-            earliest_date = batch[0]["date"].strftime("%Y-%m-%d")
-            caption_text, ai_hashtags = generate_caption(country, city, len(batch), earliest_date)
-
-            # Combine AI hashtags with base + country hashtags
-            hashtags = _select_hashtags(country, city, ai_hashtags)
-
-            # Build post.json
-            post_data = {
-                "id": post_id,
-                "status": "draft",
-                "country": country,
-                "city": city,
-                "location_display": f"{city}, {country}",
-                "photos": photo_entries,
-                "caption": {
-                    "text": caption_text,
-                    "hashtags": hashtags,
-                    "generated_by": "claude-api",
-                    "edited": False,
-                },
-                "schedule": {
-                    "suggested_date": None,
-                    "suggested_time": None,
-                    "scheduled_at": None,
-                    "published_at": None,
-                },
-                "meta": {
-                    "created_at": datetime.now().isoformat(),
-                    "approved_at": None,
-                    "instagram_post_id": None,
-                },
-            }
-
-            post_json_path = draft_dir / "post.json"
-            with open(post_json_path, "w", encoding="utf-8") as f:
-                json.dump(post_data, f, ensure_ascii=False, indent=2)
-
-            # Remove originals from 02_classified
-            for p in batch:
-                p["path"].unlink()
-
-            logger.info(
-                f"Created draft: {post_id} - {city}, {country} "
-                f"({len(batch)} photos)"
-            )
-            created.append(post_data)
-
-            # Small delay between posts to get unique IDs
-            import time
-            time.sleep(1)
+    for (country, city, batch), (caption_text, ai_hashtags) in zip(jobs, captions):
+        post_id = _generate_post_id()
+        draft_dir = DRAFTS_DIR / f"draft_{post_id}"
+        photos_dir = draft_dir / "photos"
+        photos_dir.mkdir(parents=True, exist_ok=True)
+
+        # Link (or copy) photos into draft
+        photo_entries = []
+        for i, p in enumerate(batch, 1):
+            ext = p["path"].suffix
+            dest_name = f"{i:02d}{ext}"
+            dest_path = photos_dir / dest_name
+            try:
+                # Hardlink: the original is removed below, so no data needs copying
+                os.link(p["path"], dest_path)
+            except OSError:
+                shutil.copy2(p["path"], dest_path)
+
+            gps = read_gps(p["path"], p["exif"])
+            photo_entries.append({
+                "filename": dest_name,
+                "original_name": p["path"].name,
+                "gps": gps,
+                "taken_at": p["date"].isoformat(),
+            })
+
+        # Combine AI hashtags with base + country hashtags
+        hashtags = _select_hashtags(country, city, ai_hashtags)
+
+        # Build post.json
+        post_data = {
+            "id": post_id,
+            "status": "draft",
+            "country": country,
+            "city": city,
+            "location_display": f"{city}, {country}",
+            "photos": photo_entries,
+            "caption": {
+                "text": caption_text,
+                "hashtags": hashtags,
+                "generated_by": "claude-api",
+                "edited": False,
+            },
+            "schedule": {
+                "suggested_date": None,
+                "suggested_time": None,
+                "scheduled_at": None,
+                "published_at": None,
+            },
+            "meta": {
+                "created_at": datetime.now().isoformat(),
+                "approved_at": None,
+                "instagram_post_id": None,
+            },
+        }
+
+        write_json(draft_dir / "post.json", post_data)
+
+        # Remove originals from 02_classified
+        for p in batch:
+            p["path"].unlink()
+
+        logger.info(
+            f"Created draft: {post_id} - {city}, {country} "
+            f"({len(batch)} photos)"
+        )
+        created.append(post_data)
 
     # Clean up empty directories in 02_classified
     _cleanup_empty_dirs(CLASSIFIED_DIR)
@@ -242,7 +275,14 @@ def create_posts():
 
 
 def _cleanup_empty_dirs(path):
-    """Remove empty directories recursively."""
-    for d in sorted(path.rglob("*"), reverse=True):
-        if d.is_dir() and not any(d.iterdir()):
-            d.rmdir()
+    """Remove empty directories recursively (keeps `path` itself)."""
+    root = os.fspath(path)
+    # Bottom-up, so a parent whose subdirs were all just removed is empty too;
+    # dirnames still lists those removed subdirs, so let rmdir decide
+    for dirpath, _dirnames, filenames in os.walk(root, topdown=False):
+        if filenames or dirpath == root:
+            continue
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            pass
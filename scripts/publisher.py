@@ -1,31 +1,52 @@
 """Publisher - uploads to Cloudinary and publishes via Meta Graph API."""
 
-import json
 import logging
 import os
-import shutil
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-from scripts.utils import BASE_DIR, load_settings
+from scripts.utils import (
+    PUBLISHED_DIR,
+    SCHEDULED_DIR,
+    get_http_session,
+    iter_images,
+    iter_subdirs,
+    load_credentials,
+    load_settings,
+    move_path,
+    read_json,
+    write_json,
+)
 
 logger = logging.getLogger("photo-to-post")
 
-SCHEDULED_DIR = BASE_DIR / "05_scheduled"
-PUBLISHED_DIR = BASE_DIR / "06_published"
+
+# Parallel uploads/requests per post (carousels have at most 10 photos)
+UPLOAD_WORKERS = 8
+CLOUDINARY_CHUNK_SIZE = 6 * 1024 * 1024
+
+# Formats Instagram accepts
+_EXTS = (".jpg", ".jpeg", ".png")
 
 
 def _get_credentials():
-    creds_path = BASE_DIR / "config" / "credentials.json"
-    try:
-        with open(creds_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    return load_credentials()
 
 
-def _upload_to_cloudinary(image_path):
-    """Upload an image to Cloudinary and return the public URL."""
+# (cloud_name, api_key, api_secret) last passed to cloudinary.config()
+_cloudinary_config = None
+
+
+def _configure_cloudinary():
+    """Import and configure the Cloudinary SDK; return its uploader.
+
+    The SDK config is module-global, so it is only rewritten when the
+    credentials change, not by every upload.
+    """
+    global _cloudinary_config
     creds = _get_credentials()
     settings = load_settings()
 
@@ -46,27 +67,56 @@ def _upload_to_cloudinary(image_path):
     import cloudinary
     import cloudinary.uploader
 
-    cloudinary.config(
-        cloud_name=cloud_name,
-        api_key=api_key,
-        api_secret=api_secret,
-    )
+    config = (cloud_name, api_key, api_secret)
+    if config != _cloudinary_config:
+        cloudinary.config(
+            cloud_name=cloud_name,
+            api_key=api_key,
+            api_secret=api_secret,
+        )
+        _cloudinary_config = config
+    return cloudinary.uploader
 
-    result = cloudinary.uploader.upload(str(image_path), folder="photo-to-post")
+
+def _upload_to_cloudinary(image_path):
+    """Upload an image to Cloudinary and return the public URL."""
+    uploader = _configure_cloudinary()
+
+    # upload_large streams the file in chunks instead of reading it into memory whole
+    result = uploader.upload_large(
+        str(image_path),
+        folder="photo-to-post",
+        resource_type="image",
+        chunk_size=CLOUDINARY_CHUNK_SIZE,
+    )
     url = result.get("secure_url")
     logger.info(f"Uploaded to Cloudinary: {Path(image_path).name} → {url}")
     return url
 
 
-def _check_container_status(container_id, access_token, max_attempts=10):
-    """Check if a media container is ready for publishing."""
-    import requests
-    import time
+def _upload_many_to_cloudinary(image_paths):
+    """Upload several images in parallel and return their URLs in input order."""
+    if len(image_paths) <= 1:
+        return [_upload_to_cloudinary(p) for p in image_paths]
+
+    _configure_cloudinary()
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(image_paths))) as ex:
+        return list(ex.map(_upload_to_cloudinary, image_paths))
 
+
+def _check_container_status(container_id, access_token, timeout=60.0):
+    """Check if a media container is ready for publishing.
+
+    Polls with exponential backoff (0.25s doubling up to 8s, plus jitter)
+    until the container finishes, fails, or `timeout` seconds have passed.
+    """
     api_base = "https://graph.facebook.com/v22.0"
+    session = get_http_session()
+    deadline = time.monotonic() + timeout
+    delay = 0.25
 
-    for attempt in range(max_attempts):
-        resp = requests.get(
+    while True:
+        resp = session.get(
             f"{api_base}/{container_id}",
             params={
                 "fields": "status_code",
@@ -76,22 +126,24 @@ def _check_container_status(container_id, access_token, max_attempts=10):
         )
         if not resp.ok:
             logger.warning(f"Status check failed: {resp.text}")
-            time.sleep(2)
-            continue
-
-        status = resp.json().get("status_code")
-        logger.debug(f"Container {container_id} status: {status}")
-
-        if status == "FINISHED":
-            return True
-        elif status in ("ERROR", "EXPIRED"):
-            logger.error(f"Container {container_id} failed with status: {status}")
-            return False
-
-        # Still processing, wait and retry
-        time.sleep(2)
-
-    logger.warning(f"Container {container_id} still not ready after {max_attempts} attempts")
+        else:
+            status = resp.json().get("status_code")
+            logger.debug(f"Container {container_id} status: {status}")
+
+            if status == "FINISHED":
+                return True
+            elif status in ("ERROR", "EXPIRED"):
+                logger.error(f"Container {container_id} failed with status: {status}")
+                return False
+
+        # Still processing (or transient error), back off and retry
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay + random.uniform(0, 0.2 * delay), remaining))
+        delay = min(delay * 2, 8.0)
+
+    logger.warning(f"Container {container_id} still not ready after {timeout:.0f}s")
     return False
 
 
@@ -101,7 +153,7 @@ def _ensure_size_limit(image_urls, max_bytes=8 * 1024 * 1024):
     Meta API rejects images over 8MB. For Cloudinary URLs, we can add
     a quality transformation to reduce file size without re-uploading.
     """
-    import requests as _req
+    session = get_http_session()
 
     result = []
     for url in image_urls:
@@ -109,7 +161,7 @@ def _ensure_size_limit(image_urls, max_bytes=8 * 1024 * 1024):
             result.append(url)
             continue
         try:
-            r = _req.head(url, timeout=10)
+            r = session.head(url, timeout=10)
             size = int(r.headers.get("content-length", 0))
             if size > max_bytes:
                 optimized = url.replace("/upload/", "/upload/q_auto/")
@@ -139,9 +191,6 @@ def _publish_to_instagram(image_urls, caption_text, hashtags):
             "in config/credentials.json or environment variables."
         )
 
-    import requests
-    import time
-
     # Ensure no image exceeds Meta's 8MB limit
     image_urls = _ensure_size_limit(image_urls)
 
@@ -150,10 +199,11 @@ def _publish_to_instagram(image_urls, caption_text, hashtags):
         full_caption += "\n\n" + " ".join(hashtags)
 
     api_base = "https://graph.facebook.com/v22.0"
+    session = get_http_session()
 
     if len(image_urls) == 1:
         # Single image post
-        resp = requests.post(
+        resp = session.post(
             f"{api_base}/{ig_user_id}/media",
             data={
                 "image_url": image_urls[0],
@@ -166,10 +216,9 @@ def _publish_to_instagram(image_urls, caption_text, hashtags):
         creation_id = resp.json()["id"]
 
     else:
-        # Carousel post
-        children_ids = []
-        for url in image_urls:
-            resp = requests.post(
+        # Carousel post: create and wait for all items in parallel
+        def _create_child(url):
+            resp = session.post(
                 f"{api_base}/{ig_user_id}/media",
                 data={
                     "image_url": url,
@@ -181,15 +230,20 @@ def _publish_to_instagram(image_urls, caption_text, hashtags):
             if not resp.ok:
                 logger.error(f"Meta API error (carousel item): {resp.text}")
                 resp.raise_for_status()
-            children_ids.append(resp.json()["id"])
+            return resp.json()["id"]
 
-        # Wait for all carousel items to be processed
-        logger.info("Waiting for carousel items to be processed...")
-        for child_id in children_ids:
-            if not _check_container_status(child_id, access_token):
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(image_urls))) as ex:
+            # map() keeps the children in carousel order
+            children_ids = list(ex.map(_create_child, image_urls))
+
+            logger.info("Waiting for carousel items to be processed...")
+            ready = list(ex.map(lambda cid: _check_container_status(cid, access_token), children_ids))
+
+        for child_id, ok in zip(children_ids, ready):
+            if not ok:
                 raise RuntimeError(f"Carousel item {child_id} failed to process")
 
-        resp = requests.post(
+        resp = session.post(
             f"{api_base}/{ig_user_id}/media",
             data={
                 "media_type": "CAROUSEL",
@@ -208,7 +262,7 @@ def _publish_to_instagram(image_urls, caption_text, hashtags):
         raise RuntimeError(f"Media container {creation_id} failed to process")
 
     # Publish the container
-    resp = requests.post(
+    resp = session.post(
         f"{api_base}/{ig_user_id}/media_publish",
         data={
             "creation_id": creation_id,
@@ -226,16 +280,33 @@ def _publish_to_instagram(image_urls, caption_text, hashtags):
 
 
 def _find_post(post_id):
-    """Find a scheduled post by ID."""
+    """Find a scheduled post by ID.
+
+    Approving a draft moves it to `post_<id>/`, which keeps that name when
+    scheduled, so try the conventional names first, then any folder whose
+    name ends with the ID, and only parse every post.json as a last resort.
+    """
     if not SCHEDULED_DIR.exists():
         return None, None
-    for d in SCHEDULED_DIR.iterdir():
-        pj = d / "post.json"
-        if pj.exists():
-            with open(pj, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if data.get("id") == post_id:
-                return d, data
+    for name in (f"post_{post_id}", f"draft_{post_id}", post_id):
+        d = SCHEDULED_DIR / name
+        try:
+            data = read_json(d / "post.json")
+        except (OSError, ValueError):
+            continue
+        if data.get("id") == post_id:
+            return d, data
+
+    entries = iter_subdirs(SCHEDULED_DIR)
+    # Likely matches first; the rest are only parsed if none of those match
+    entries.sort(key=lambda e: not e.name.endswith(post_id))
+    for entry in entries:
+        try:
+            data = read_json(os.path.join(entry.path, "post.json"))
+        except FileNotFoundError:
+            continue
+        if data.get("id") == post_id:
+            return Path(entry.path), data
     return None, None
 
 
@@ -261,19 +332,17 @@ def publish_post(post_id):
         image_urls = [p["cloudinary_url"] for p in photos_data]
     else:
         # Upload photos to Cloudinary
-        photo_files = sorted(
-            f for f in photos_dir.iterdir()
-            if f.is_file() and f.suffix.lower() in (".jpg", ".jpeg", ".png")
-        )
+        photo_files = [
+            Path(entry.path)
+            for entry in sorted(iter_images(photos_dir, _EXTS), key=lambda e: e.name)
+        ]
 
         if not photo_files:
             logger.error(f"No photos found for post {post_id}")
             return None
 
         logger.info(f"Uploading {len(photo_files)} photos to Cloudinary...")
-        for photo in photo_files:
-            url = _upload_to_cloudinary(photo)
-            image_urls.append(url)
+        image_urls = _upload_many_to_cloudinary(photo_files)
 
     # Step 2: Publish to Instagram
     caption = data.get("caption", {})
@@ -286,17 +355,15 @@ def publish_post(post_id):
 
     # Step 3: Update post data
     data["status"] = "published"
-    data["schedule"]["published_at"] = datetime.now().isoformat()
+    now = datetime.now()
+    data["schedule"]["published_at"] = now.isoformat()
     data["meta"]["instagram_post_id"] = ig_post_id
 
     # Step 4: Move to 06_published/{year}/{month}/
-    now = datetime.now()
     archive_dir = PUBLISHED_DIR / str(now.year) / f"{now.month:02d}" / post_dir.name
     archive_dir.parent.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(post_dir), str(archive_dir))
-
-    with open(archive_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    move_path(post_dir, archive_dir)
+    write_json(archive_dir / "post.json", data)
 
     logger.info(f"Published and archived: {post_id} → 06_published/{now.year}/{now.month:02d}/")
     return ig_post_id
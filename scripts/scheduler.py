@@ -1,63 +1,153 @@
 """Scheduler - manages post scheduling with diversity rules."""
 
-import json
+import heapq
+import itertools
 import logging
-import shutil
-from collections import defaultdict
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
 
-from scripts.utils import BASE_DIR, load_settings
+from scripts.utils import (
+    APPROVED_DIR,
+    PUBLISHED_DIR,
+    SCHEDULED_DIR,
+    iter_subdirs,
+    load_json_cached,
+    load_settings,
+    move_path,
+    write_json,
+)
 
 logger = logging.getLogger("photo-to-post")
 
-APPROVED_DIR = BASE_DIR / "04_approved"
-SCHEDULED_DIR = BASE_DIR / "05_scheduled"
-PUBLISHED_DIR = BASE_DIR / "06_published"
+
+# Threads used to read post folders in bulk
+READ_WORKERS = 8
+
+# Keys the date/country scans need from each post
+_DATE_FIELDS = ("schedule", "country")
+_GRID_FIELDS = ("schedule", "country", "id")
+
+
+def _cached_post(post_dir):
+    """Return the shared parsed post.json of post_dir, or None if it has none.
+
+    Parsed posts are cached per (mtime, size), since one scheduling pass or
+    schedule page reads the same folders several times. Don't mutate the
+    result: use _read_post() or _post_fields() instead.
+    """
+    try:
+        return load_json_cached(os.path.join(post_dir, "post.json"))
+    except FileNotFoundError:
+        return None
+
+
+def _read_post(post_dir):
+    """Parse post_dir/post.json, or return None if the folder has none.
+
+    Callers get their own copy (including the "schedule" dict, which
+    schedule_posts edits).
+    """
+    cached = _cached_post(post_dir)
+    if cached is None:
+        return None
+    data = dict(cached)
+    if isinstance(data.get("schedule"), dict):
+        data["schedule"] = dict(data["schedule"])
+    data["_dir"] = str(post_dir)
+    return data
+
+
+def _post_fields(post_dir, fields):
+    """Return a read-only projection of post_dir/post.json with just `fields`.
+
+    For scans that only look at a couple of keys (schedule, country), so
+    they skip copying the whole post and its caption/photo lists.
+    """
+    cached = _cached_post(post_dir)
+    if cached is None:
+        return None
+    return {k: cached[k] for k in fields if k in cached}
+
+
+def _iter_posts(directory, fields=None):
+    """Lazily yield (DirEntry, post) for each post folder, in directory order.
+
+    For single-pass readers that don't need the sorted list. With `fields`,
+    posts are read-only projections from _post_fields().
+    """
+    try:
+        it = os.scandir(directory)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if fields is None:
+                    data = _read_post(entry.path)
+                else:
+                    data = _post_fields(entry.path, fields)
+                if data is not None:
+                    yield entry, data
+
+
+def _read_posts(post_dirs, fields=None):
+    """Read several post folders, in order, skipping those without post.json.
+
+    Larger batches are read on a thread pool: the reads are latency-bound
+    (cold cache, network drives) and release the GIL while waiting. With
+    `fields`, posts are read-only projections from _post_fields().
+    """
+    if fields is None:
+        read = _read_post
+    else:
+        def read(post_dir):
+            return _post_fields(post_dir, fields)
+
+    post_dirs = list(post_dirs)
+    if len(post_dirs) < 2 * READ_WORKERS:
+        results = map(read, post_dirs)
+    else:
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+            results = list(ex.map(read, post_dirs))
+    return [p for p in results if p is not None]
 
 
 def _load_posts_from(directory):
-    posts = []
-    directory = Path(directory)
-    if not directory.exists():
-        return posts
-    for d in sorted(directory.iterdir()):
-        pj = d / "post.json"
-        if pj.exists():
-            with open(pj, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            data["_dir"] = str(d)
-            posts.append(data)
-    return posts
+    return _read_posts(entry.path for entry in iter_subdirs(directory))
+
+
+def _iter_published_dirs():
+    """Yield the paths of post folders in 06_published/{year}/{month}/, in name order.
+
+    One os.walk over the tree: "post.json" is checked against each folder's
+    file list instead of being probed, and the walk never descends below
+    the post folders (so photos/ is never listed).
+    """
+    root = os.fspath(PUBLISHED_DIR)
+    base_depth = root.rstrip(os.sep).count(os.sep)
+    for dirpath, dirnames, filenames in os.walk(root):
+        depth = dirpath.count(os.sep) - base_depth
+        if depth >= 3:
+            dirnames.clear()
+            if "post.json" in filenames:
+                yield dirpath
+        else:
+            dirnames.sort()
 
 
 def _load_published_posts():
     """Load all published posts from the nested year/month structure."""
-    posts = []
-    if not PUBLISHED_DIR.exists():
-        return posts
-
-    for year_dir in sorted(PUBLISHED_DIR.iterdir()):
-        if not year_dir.is_dir():
-            continue
-        for month_dir in sorted(year_dir.iterdir()):
-            if not month_dir.is_dir():
-                continue
-            for post_dir in sorted(month_dir.iterdir()):
-                pj = post_dir / "post.json"
-                if pj.exists():
-                    with open(pj, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    data["_dir"] = str(post_dir)
-                    posts.append(data)
-    return posts
+    return _read_posts(_iter_published_dirs())
 
 
 def _get_scheduled_dates():
     """Return a dict of date -> list of post countries already scheduled."""
-    scheduled = _load_posts_from(SCHEDULED_DIR)
     by_date = defaultdict(list)
-    for p in scheduled:
+    for _, p in _iter_posts(SCHEDULED_DIR, _DATE_FIELDS):
         sched = p.get("schedule", {})
         sd = sched.get("suggested_date")
         # Also check scheduled_at (set by confirm-custom endpoint)
@@ -68,6 +158,15 @@ def _get_scheduled_dates():
     return by_date
 
 
+def _next_free_date():
+    """Return the first day from tomorrow on with no post scheduled yet (max 1 per day)."""
+    taken = set(_get_scheduled_dates())
+    next_date = datetime.now().date() + timedelta(days=1)
+    while next_date.isoformat() in taken:
+        next_date += timedelta(days=1)
+    return next_date
+
+
 def _get_last_scheduled_countries():
     """Return list of countries from most recent scheduled posts (newest first)."""
     scheduled = _load_posts_from(SCHEDULED_DIR)
@@ -90,111 +189,133 @@ def _get_last_scheduled_countries():
     return [c for _, _, c in dated]
 
 
+def _grid_key(post):
+    """Return the (date, time) a post sits at in the grid, or None if unknown.
+
+    Priority: suggested_date > published_at > id (which contains timestamp)
+    """
+    schedule = post.get("schedule", {})
+    sd = schedule.get("suggested_date")
+    st = schedule.get("suggested_time", "00:00")
+
+    # Try published_at if no suggested_date
+    if not sd:
+        published_at = schedule.get("published_at")
+        if published_at:
+            # Extract date from ISO format
+            sd = published_at[:10]
+            st = published_at[11:16] if len(published_at) > 16 else "00:00"
+
+    # Fallback to post ID (contains YYYYMMDD_HHMMSS)
+    if not sd:
+        post_id = post.get("id", "")
+        if "_" in post_id:
+            # Extract date from id like "post_20260206_232050"
+            parts = post_id.split("_")
+            if len(parts) >= 2 and len(parts[1]) == 8:
+                sd = f"{parts[1][:4]}-{parts[1][4:6]}-{parts[1][6:8]}"
+                st = "00:00"
+
+    return (sd, st) if sd else None
+
+
+def _leading_run(dated):
+    """Return (country, run_length) of the leading run in newest-first tuples."""
+    last_country = dated[0][2]
+    for i, (_, _, country) in enumerate(dated):
+        if country != last_country:
+            return last_country, i
+    return last_country, len(dated)
+
+
 def _get_grid_state():
     """Get the current state of the Instagram grid (most recent posts first).
 
     Returns (last_country, count_in_current_row) where count is how many posts
     of last_country are already in the current incomplete row (0-2).
-    """
-    scheduled = _load_posts_from(SCHEDULED_DIR)
-    published = _load_published_posts()
-    all_posts = scheduled + published
-
-    if not all_posts:
-        return None, 0
 
-    # Sort by best available date (newest first)
-    # Priority: suggested_date > published_at > id (which contains timestamp)
+    Every published month is read: posts can be published before their
+    suggested date (publish-now, `run.py publish`), so the year/month folders
+    don't bound their grid dates.
+    """
     dated = []
-    for p in all_posts:
-        schedule = p.get("schedule", {})
-        sd = schedule.get("suggested_date")
-        st = schedule.get("suggested_time", "00:00")
-
-        # Try published_at if no suggested_date
-        if not sd:
-            published_at = schedule.get("published_at")
-            if published_at:
-                # Extract date from ISO format
-                sd = published_at[:10]
-                st = published_at[11:16] if len(published_at) > 16 else "00:00"
-
-        # Fallback to post ID (contains YYYYMMDD_HHMMSS)
-        if not sd:
-            post_id = p.get("id", "")
-            if "_" in post_id:
-                # Extract date from id like "post_20260206_232050"
-                parts = post_id.split("_")
-                if len(parts) >= 2 and len(parts[1]) == 8:
-                    try:
-                        sd = f"{parts[1][:4]}-{parts[1][4:6]}-{parts[1][6:8]}"
-                        st = "00:00"
-                    except:
-                        pass
-
-        if sd:
-            dated.append((sd, st, p.get("country", "")))
-
-    dated.sort(reverse=True)
+    for p in _read_posts(_iter_published_dirs(), _GRID_FIELDS):
+        key = _grid_key(p)
+        if key:
+            dated.append((*key, p.get("country", "")))
+    for _, p in _iter_posts(SCHEDULED_DIR, _GRID_FIELDS):
+        key = _grid_key(p)
+        if key:
+            dated.append((*key, p.get("country", "")))
 
     if not dated:
         return None, 0
 
-    # Get the most recent posts and count consecutive same-country
-    last_country = dated[0][2]
-    count = 0
-    for _, _, country in dated:
-        if country == last_country:
-            count += 1
-        else:
-            break
-
+    dated.sort(reverse=True)
+    last_country, count = _leading_run(dated)
     # How many are in the current incomplete row (modulo 3)
-    remainder = count % 3
-    return last_country, remainder
+    return last_country, count % 3
 
 
 def _apply_diversity_rule(posts, max_consecutive):
-    """Reorder posts so no more than max_consecutive from the same country appear in a row."""
+    """Reorder posts so no more than max_consecutive from the same country appear in a row.
+
+    Greedy: always take the earliest remaining post, unless its country has
+    just filled a run of max_consecutive, in which case take the earliest post
+    from any other country. Per-country queues plus a heap of their heads make
+    this O(N log C) instead of rescanning the remaining list for every post.
+    """
     if not posts or max_consecutive <= 0:
         return posts
 
+    buckets = defaultdict(deque)
+    for i, post in enumerate(posts):
+        buckets[post.get("country")].append((i, post))
+    # (index of the bucket's first post, country)
+    heads = [(q[0][0], country) for country, q in buckets.items()]
+    heapq.heapify(heads)
+
     result = []
-    remaining = list(posts)
-
-    while remaining:
-        placed = False
-        for i, post in enumerate(remaining):
-            # Check if placing this post would violate the rule
-            recent = [p.get("country") for p in result[-max_consecutive:]]
-            if len(recent) < max_consecutive or not all(c == post.get("country") for c in recent):
-                result.append(remaining.pop(i))
-                placed = True
+    last_country, run_len = None, 0
+
+    while heads:
+        _, country = heapq.heappop(heads)
+        if country == last_country and run_len >= max_consecutive:
+            if not heads:
+                # Can't avoid violation, just append the rest
+                result.extend(post for _, post in buckets[country])
                 break
+            blocked = (buckets[country][0][0], country)
+            _, country = heapq.heappop(heads)
+            heapq.heappush(heads, blocked)
 
-        if not placed:
-            # Can't avoid violation, just append the rest
-            result.extend(remaining)
-            break
+        queue = buckets[country]
+        result.append(queue.popleft()[1])
+        if queue:
+            heapq.heappush(heads, (queue[0][0], country))
+
+        if country == last_country:
+            run_len += 1
+        else:
+            last_country, run_len = country, 1
 
     return result
 
 
-def _apply_grid_mode(posts, group_size=3):
+def _apply_grid_mode(posts, group_size=3, grid_state=None):
     """Reorder posts to group same country in blocks of group_size for Instagram grid aesthetics.
 
     Considers already published/scheduled posts to complete the current row first.
+    `grid_state` is a precomputed _get_grid_state() result; computed here if None.
     """
     if not posts:
         return posts
 
-    from collections import defaultdict
-
     # Get current grid state (last country and how many in incomplete row)
-    last_country, remainder = _get_grid_state()
+    last_country, remainder = grid_state if grid_state is not None else _get_grid_state()
 
     # Group posts by country
-    by_country = defaultdict(list)
+    by_country = defaultdict(deque)
     for post in posts:
         by_country[post.get("country", "Unknown")].append(post)
 
@@ -206,7 +327,7 @@ def _apply_grid_mode(posts, group_size=3):
         if last_country in by_country and by_country[last_country]:
             # Take posts of the same country to complete the row
             while by_country[last_country] and needed > 0:
-                result.append(by_country[last_country].pop(0))
+                result.append(by_country[last_country].popleft())
                 needed -= 1
             logger.info(f"Grid mode: completing row with {group_size - remainder - needed} more {last_country} posts (had {remainder} published)")
 
@@ -214,14 +335,14 @@ def _apply_grid_mode(posts, group_size=3):
     sorted_countries = sorted(by_country.keys(), key=lambda c: len(by_country[c]), reverse=True)
 
     # Keep taking groups of 3 from each country in round-robin fashion
-    while any(by_country.values()):
+    left = len(posts) - len(result)
+    while left:
         for country in sorted_countries:
-            if by_country[country]:
-                # Take up to group_size posts from this country
-                chunk = []
-                while by_country[country] and len(chunk) < group_size:
-                    chunk.append(by_country[country].pop(0))
-                result.extend(chunk)
+            queue = by_country[country]
+            # Take up to group_size posts from this country
+            for _ in range(min(group_size, len(queue))):
+                result.append(queue.popleft())
+                left -= 1
 
     return result
 
@@ -243,31 +364,20 @@ def preview_schedule():
 
     # Apply ordering rule based on mode
     if grid_mode:
-        approved = _apply_grid_mode(approved, group_size=3)
+        approved = _apply_grid_mode(approved, group_size=3, grid_state=_get_grid_state())
     else:
         approved = _apply_diversity_rule(approved, max_consecutive)
 
-    # Calculate posting interval
-    days_between = 7 / posts_per_week
-    time_idx = 0
-
-    # Find the next available date
-    scheduled_dates = _get_scheduled_dates()
-    next_date = datetime.now().date() + timedelta(days=1)
-
-    while True:
-        date_str = next_date.strftime("%Y-%m-%d")
-        existing = scheduled_dates.get(date_str, [])
-        if len(existing) < 1:
-            break
-        next_date += timedelta(days=1)
+    # Calculate posting interval (date arithmetic drops the fractional day)
+    delta = timedelta(days=7 / posts_per_week)
+    times = itertools.cycle(preferred_times)
 
     preview = []
-    current_date = next_date
+    current_date = _next_free_date()
 
     for post in approved:
-        date_str = current_date.strftime("%Y-%m-%d")
-        time_str = preferred_times[time_idx % len(preferred_times)]
+        date_str = current_date.isoformat()
+        time_str = next(times)
 
         preview.append({
             "id": post["id"],
@@ -278,26 +388,27 @@ def preview_schedule():
             "scheduled_time": time_str,
         })
 
-        time_idx += 1
-        current_date += timedelta(days=days_between)
+        current_date += delta
 
     return preview
 
 
 def _upload_photos_to_cloudinary(post_dir, photos):
     """Upload all photos to Cloudinary and return updated photo entries with URLs."""
-    from scripts.publisher import _upload_to_cloudinary
+    from scripts.publisher import _upload_many_to_cloudinary
 
-    updated_photos = []
+    updated_photos = list(photos)
     photos_dir = Path(post_dir) / "photos"
 
-    for photo in photos:
-        photo_path = photos_dir / photo["filename"]
-        if photo_path.exists() and not photo.get("cloudinary_url"):
-            url = _upload_to_cloudinary(photo_path)
-            photo = dict(photo)
-            photo["cloudinary_url"] = url
-        updated_photos.append(photo)
+    # Upload the missing ones in parallel, then put the URLs back in order
+    pending = [
+        (i, photos_dir / photo["filename"])
+        for i, photo in enumerate(photos)
+        if not photo.get("cloudinary_url") and (photos_dir / photo["filename"]).exists()
+    ]
+    urls = _upload_many_to_cloudinary([path for _, path in pending])
+    for (i, _), url in zip(pending, urls):
+        updated_photos[i] = dict(photos[i], cloudinary_url=url)
 
     return updated_photos
 
@@ -322,62 +433,46 @@ def schedule_posts():
 
     # Apply ordering rule based on mode
     if grid_mode:
-        approved = _apply_grid_mode(approved, group_size=3)
+        approved = _apply_grid_mode(approved, group_size=3, grid_state=_get_grid_state())
     else:
         approved = _apply_diversity_rule(approved, max_consecutive)
 
-    # Calculate posting interval
-    days_between = 7 / posts_per_week
-    time_idx = 0
-
-    # Find the next available date
-    scheduled_dates = _get_scheduled_dates()
-    next_date = datetime.now().date() + timedelta(days=1)
-
-    # Skip dates that already have posts at all preferred times
-    while True:
-        date_str = next_date.strftime("%Y-%m-%d")
-        existing = scheduled_dates.get(date_str, [])
-        if len(existing) < 1:  # Max 1 post per slot
-            break
-        next_date += timedelta(days=1)
+    # Calculate posting interval (date arithmetic drops the fractional day)
+    delta = timedelta(days=7 / posts_per_week)
+    times = itertools.cycle(preferred_times)
 
     scheduled = []
-    current_date = next_date
+    current_date = _next_free_date()
+    SCHEDULED_DIR.mkdir(parents=True, exist_ok=True)
+    # One timestamp for the whole batch
+    scheduled_at = datetime.now().isoformat()
 
     for post in approved:
         post_dir = Path(post["_dir"])
-        date_str = current_date.strftime("%Y-%m-%d")
-        time_str = preferred_times[time_idx % len(preferred_times)]
+        date_str = current_date.isoformat()
+        time_str = next(times)
 
         # Upload to Cloudinary if cloud_mode is enabled
         if cloud_mode:
-            logger.info(f"Uploading photos to Cloudinary for {post['id']}...")
+            logger.info("Uploading photos to Cloudinary for %s...", post["id"])
             post["photos"] = _upload_photos_to_cloudinary(post_dir, post["photos"])
 
         post["status"] = "scheduled"
         post["schedule"]["suggested_date"] = date_str
         post["schedule"]["suggested_time"] = time_str
-        post["schedule"]["scheduled_at"] = datetime.now().isoformat()
+        post["schedule"]["scheduled_at"] = scheduled_at
 
-        # Move to 05_scheduled
-        dest = SCHEDULED_DIR / post_dir.name
-        SCHEDULED_DIR.mkdir(parents=True, exist_ok=True)
+        # Move to 05_scheduled, then save: a failed move leaves the post approved
         del post["_dir"]
-        shutil.move(str(post_dir), str(dest))
-
-        with open(dest / "post.json", "w", encoding="utf-8") as f:
-            json.dump(post, f, ensure_ascii=False, indent=2)
+        dest = SCHEDULED_DIR / post_dir.name
+        move_path(post_dir, dest)
+        write_json(dest / "post.json", post)
 
-        logger.info(f"Scheduled: {post['id']} → {date_str} {time_str} ({post.get('location_display', '')})")
+        logger.info("Scheduled: %s → %s %s (%s)", post["id"], date_str, time_str, post.get("location_display", ""))
         scheduled.append(post)
 
         # Advance date
-        time_idx += 1
-        current_date += timedelta(days=days_between)
-        # Round to next whole day if fractional
-        if days_between != int(days_between) and time_idx % posts_per_week == 0:
-            current_date = current_date.replace(hour=0, minute=0, second=0, microsecond=0) if hasattr(current_date, 'hour') else current_date
+        current_date += delta
 
     logger.info(f"Total scheduled: {len(scheduled)}")
     return scheduled
@@ -390,41 +485,27 @@ def get_calendar():
     """
     calendar = defaultdict(list)
 
-    for post in _load_posts_from(SCHEDULED_DIR):
-        date = post.get("schedule", {}).get("suggested_date", "unknown")
-        time = post.get("schedule", {}).get("suggested_time", "")
-        calendar[date].append({
-            "id": post["id"],
-            "location": post.get("location_display", ""),
-            "country": post.get("country", ""),
-            "time": time,
-            "status": "scheduled",
-            "photos": len(post.get("photos", [])),
-        })
-
-    # Include published posts
-    if PUBLISHED_DIR.exists():
-        for year_dir in sorted(PUBLISHED_DIR.iterdir()):
-            if not year_dir.is_dir():
-                continue
-            for month_dir in year_dir.iterdir():
-                if not month_dir.is_dir():
-                    continue
-                for post_dir in month_dir.iterdir():
-                    pj = post_dir / "post.json"
-                    if pj.exists():
-                        with open(pj, "r", encoding="utf-8") as f:
-                            post = json.load(f)
-                        date = post.get("schedule", {}).get("suggested_date", "unknown")
-                        calendar[date].append({
-                            "id": post["id"],
-                            "location": post.get("location_display", ""),
-                            "country": post.get("country", ""),
-                            "time": post.get("schedule", {}).get("suggested_time", ""),
-                            "status": "published",
-                            "photos": len(post.get("photos", [])),
-                        })
-
-    # Filter out None keys and sort
-    filtered = {k: v for k, v in calendar.items() if k is not None}
-    return dict(sorted(filtered.items(), key=lambda x: x[0] if x[0] != "unknown" else "9999-99-99"))
+    # One pass over scheduled then published posts, read on the thread pool
+    sources = [
+        ("scheduled", _load_posts_from(SCHEDULED_DIR)),
+        ("published", _load_published_posts()),
+    ]
+    for status, posts in sources:
+        for post in posts:
+            schedule = post.get("schedule", {})
+            calendar[schedule.get("suggested_date", "unknown")].append({
+                "id": post["id"],
+                "location": post.get("location_display", ""),
+                "country": post.get("country", ""),
+                "time": schedule.get("suggested_time", ""),
+                "status": status,
+                "photos": len(post.get("photos", [])),
+            })
+
+    # Drop posts without a date (None), sort by date, "unknown" goes last
+    calendar.pop(None, None)
+    unknown = calendar.pop("unknown", None)
+    result = dict(sorted(calendar.items(), key=itemgetter(0)))
+    if unknown is not None:
+        result["unknown"] = unknown
+    return result
@@ -1,14 +1,24 @@
+import errno
+import functools
 import json
 import logging
 import os
+import shutil
 from pathlib import Path
 
-# Detect BASE_DIR: use script location or environment variable
+try:
+    import orjson
+except ImportError:  # Optional speedup, stdlib json is the fallback
+    orjson = None
+
+# Detect BASE_DIR once at import: PHOTO_TO_POST_BASE env var, else the local
+# Windows folder, else the script location (GitHub Actions)
 _script_dir = Path(__file__).resolve().parent.parent
 _hardcoded = Path("D:/photo-to-post")
 
-# Use hardcoded path if it exists (local Windows), otherwise use script directory (GitHub Actions)
-if _hardcoded.exists() and (_hardcoded / "config").exists():
+if os.environ.get("PHOTO_TO_POST_BASE"):
+    BASE_DIR = Path(os.environ["PHOTO_TO_POST_BASE"]).resolve()
+elif _hardcoded.exists() and (_hardcoded / "config").exists():
     BASE_DIR = _hardcoded
 else:
     BASE_DIR = _script_dir
@@ -20,7 +30,14 @@ STAGE_DIRS = [
     "05_scheduled",
     "06_published",
 ]
+INPUT_DIR = BASE_DIR / "01_input"
+CLASSIFIED_DIR = BASE_DIR / "02_classified"
+DRAFTS_DIR = BASE_DIR / "03_drafts"
+APPROVED_DIR = BASE_DIR / "04_approved"
+SCHEDULED_DIR = BASE_DIR / "05_scheduled"
+PUBLISHED_DIR = BASE_DIR / "06_published"
 CONFIG_DIR = BASE_DIR / "config"
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".tiff")
 LOGS_DIR = BASE_DIR / "logs"
 
 
@@ -48,34 +65,152 @@ def setup_logging():
     return logging.getLogger("photo-to-post")
 
 
+def read_json(path):
+    """Read and parse a JSON file, using orjson when it is installed."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def write_json(path, data):
+    """Write data as indented UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        raw = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        raw = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(raw)
+
+
+_json_cache = {}
+
+
+def load_json_cached(path):
+    """Load a JSON file, re-reading it only when its mtime or size changes.
+
+    Raises FileNotFoundError if path is missing. The returned dict is shared
+    between callers and must not be mutated.
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _json_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    data = read_json(path)
+    _json_cache[path] = (stamp, data)
+    return data
+
+
+def clear_json_cache():
+    """Forget cached JSON files, e.g. right after rewriting them.
+
+    A rewrite within the filesystem's mtime resolution that keeps the same
+    size would otherwise still be served from the cache.
+    """
+    _json_cache.clear()
+
+
 def load_settings():
-    path = CONFIG_DIR / "settings.json"
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_json_cached(CONFIG_DIR / "settings.json")
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_session():
+    """Return a shared requests.Session.
+
+    Repeated calls to the same host (Meta Graph API, Nominatim) reuse
+    keep-alive connections instead of opening a new TLS connection each time.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 def load_hashtags():
-    path = CONFIG_DIR / "hashtags.json"
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_json_cached(CONFIG_DIR / "hashtags.json")
+
+
+def load_credentials():
+    """Return config/credentials.json (cached like settings), or {} if it is missing."""
+    try:
+        return load_json_cached(CONFIG_DIR / "credentials.json")
+    except FileNotFoundError:
+        return {}
+
+
+def _walk_files(directory):
+    """Yield a DirEntry for every file under directory, recursively.
+
+    Uses os.scandir so file/dir checks come from the directory listing
+    instead of an extra stat() per entry. Missing directories yield nothing.
+    """
+    stack = [os.fspath(directory)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+
+def move_path(src, dst):
+    """Move a file or folder with a single rename.
+
+    Falls back to shutil.move (copy + delete) only when src and dst are on
+    different filesystems.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(os.fspath(src), os.fspath(dst))
+
+
+def iter_subdirs(directory):
+    """Return the subdirectories of directory as DirEntry objects, sorted by name.
+
+    Missing directories give an empty list.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return sorted((e for e in it if e.is_dir(follow_symlinks=False)), key=lambda e: e.name)
+    except OSError:
+        return []
+
+
+def iter_images(directory, extensions=IMAGE_EXTS, recursive=False):
+    """Yield a DirEntry for every image in directory (and subdirectories if recursive)."""
+    extensions = tuple(extensions)
+    if recursive:
+        entries = _walk_files(directory)
+    else:
+        try:
+            with os.scandir(directory) as it:
+                entries = [e for e in it if e.is_file()]
+        except OSError:
+            return
+    for entry in entries:
+        if entry.name.lower().endswith(extensions):
+            yield entry
 
 
 def count_files(directory, extensions=(".jpg", ".jpeg")):
-    directory = Path(directory)
-    if not directory.exists():
-        return 0
-    count = 0
-    for f in directory.rglob("*"):
-        if f.is_file() and f.suffix.lower() in extensions:
-            count += 1
-    return count
+    extensions = tuple(extensions)
+    return sum(1 for entry in _walk_files(directory) if entry.name.lower().endswith(extensions))
 
 
 def count_posts(directory):
-    directory = Path(directory)
-    if not directory.exists():
-        return 0
-    count = 0
-    for f in directory.rglob("post.json"):
-        count += 1
-    return count
+    return sum(1 for entry in _walk_files(directory) if entry.name == "post.json")
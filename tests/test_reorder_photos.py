@@ -0,0 +1,109 @@
+"""Tests for the reorder_photos endpoint."""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask")
+
+# Point the app at an empty base folder before it is imported, even if one is exported
+_BASE_DIR = tempfile.mkdtemp()
+_SAVED_BASE = os.environ.get("PHOTO_TO_POST_BASE")
+os.environ["PHOTO_TO_POST_BASE"] = _BASE_DIR
+
+from web import app as web_app  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _cleanup_base_dir():
+    yield
+    if _SAVED_BASE is None:
+        os.environ.pop("PHOTO_TO_POST_BASE", None)
+    else:
+        os.environ["PHOTO_TO_POST_BASE"] = _SAVED_BASE
+    shutil.rmtree(_BASE_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def make_post(tmp_path, monkeypatch):
+    for name in ("DRAFTS_DIR", "APPROVED_DIR", "SCHEDULED_DIR", "PUBLISHED_DIR"):
+        monkeypatch.setattr(web_app, name, tmp_path / name)
+    web_app._POST_INDEX.clear()
+
+    def make(names):
+        post_dir = web_app.DRAFTS_DIR / "draft_p1"
+        photos_dir = post_dir / "photos"
+        photos_dir.mkdir(parents=True)
+        for name in names:
+            (photos_dir / name).write_text(name)
+        data = {
+            "id": "p1",
+            "status": "draft",
+            "photos": [{"filename": n} for n in names],
+        }
+        (post_dir / "post.json").write_text(json.dumps(data))
+        return post_dir
+
+    return make
+
+
+@pytest.fixture
+def post(make_post):
+    return make_post(["01.jpg", "02.jpg", "03.jpg"])
+
+
+@pytest.fixture
+def case_insensitive_fs(monkeypatch):
+    """Make os.replace behave like NTFS/APFS, where 01.JPG and 01.jpg are one file."""
+    real_replace = os.replace
+
+    def replace(src, dst):
+        src, dst = Path(src), Path(dst)
+        for existing in dst.parent.iterdir():
+            if existing != src and existing.name.casefold() == dst.name.casefold():
+                existing.unlink()
+        real_replace(src, dst)
+
+    monkeypatch.setattr(web_app.os, "replace", replace)
+
+
+def _reorder(order):
+    client = web_app.app.test_client()
+    return client.post("/api/post/p1/reorder", json={"order": order})
+
+
+def _state(post_dir):
+    files = {p.name: p.read_text() for p in (post_dir / "photos").iterdir()}
+    entries = [e["filename"] for e in json.loads((post_dir / "post.json").read_text())["photos"]]
+    return files, entries
+
+
+def test_reorder_renames_files_and_entries(post):
+    assert _reorder(["03.jpg", "01.jpg", "02.jpg"]).status_code == 200
+
+    files, entries = _state(post)
+    assert files == {"01.jpg": "03.jpg", "02.jpg": "01.jpg", "03.jpg": "02.jpg"}
+    assert entries == ["01.jpg", "02.jpg", "03.jpg"]
+
+
+def test_reorder_skips_repeated_filenames(post):
+    assert _reorder(["02.jpg", "02.jpg", "01.jpg", "03.jpg"]).status_code == 200
+
+    files, entries = _state(post)
+    # The repeat keeps its slot number unused, as when a listed file is missing
+    assert files == {"01.jpg": "02.jpg", "03.jpg": "01.jpg", "04.jpg": "03.jpg"}
+    assert entries == ["01.jpg", "03.jpg", "04.jpg"]
+    assert all((post / "photos" / e).exists() for e in entries)
+
+
+def test_reorder_mixed_case_names(make_post, case_insensitive_fs):
+    post = make_post(["01.jpg", "02.JPG"])
+    assert _reorder(["02.JPG", "01.jpg"]).status_code == 200
+
+    files, entries = _state(post)
+    assert files == {"01.JPG": "02.JPG", "02.jpg": "01.jpg"}
+    assert entries == ["01.JPG", "02.jpg"]
@@ -1,16 +1,38 @@
 """Flask web app for reviewing, approving, and scheduling posts."""
 
-import json
+import os
 import shutil
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, jsonify, render_template, request, send_from_directory
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from scripts.utils import BASE_DIR, load_settings, load_hashtags, count_files, count_posts
+from scripts.utils import (
+    APPROVED_DIR,
+    BASE_DIR,
+    CLASSIFIED_DIR,
+    CONFIG_DIR,
+    DRAFTS_DIR,
+    INPUT_DIR,
+    PUBLISHED_DIR,
+    SCHEDULED_DIR,
+    clear_json_cache,
+    count_files,
+    count_posts,
+    iter_subdirs,
+    load_hashtags,
+    load_json_cached,
+    load_settings,
+    move_path,
+    read_json,
+    write_json,
+)
 
 app = Flask(__name__)
 
@@ -36,8 +58,8 @@ def _auto_sync_on_startup():
     except Exception as e:
         print(f"[auto-sync] git pull error: {e}")
 
-    scheduled_dir = Path(BASE_DIR) / "05_scheduled"
-    published_dir = Path(BASE_DIR) / "06_published"
+    scheduled_dir = SCHEDULED_DIR
+    published_dir = PUBLISHED_DIR
 
     if not published_dir.exists() or not scheduled_dir.exists():
         return
@@ -80,75 +102,149 @@ _auto_sync_on_startup()
 def _get_counts():
     """Get counts for all pipeline stages."""
     return {
-        "input": count_files(BASE_DIR / "01_input"),
-        "classified": count_files(BASE_DIR / "02_classified"),
-        "drafts": count_posts(BASE_DIR / "03_drafts"),
-        "approved": count_posts(BASE_DIR / "04_approved"),
-        "scheduled": count_posts(BASE_DIR / "05_scheduled"),
-        "published": count_posts(BASE_DIR / "06_published"),
+        "input": count_files(INPUT_DIR),
+        "classified": count_files(CLASSIFIED_DIR),
+        "drafts": count_posts(DRAFTS_DIR),
+        "approved": count_posts(APPROVED_DIR),
+        "scheduled": count_posts(SCHEDULED_DIR),
+        "published": count_posts(PUBLISHED_DIR),
     }
 
-CLASSIFIED_DIR = BASE_DIR / "02_classified"
-DRAFTS_DIR = BASE_DIR / "03_drafts"
-APPROVED_DIR = BASE_DIR / "04_approved"
-SCHEDULED_DIR = BASE_DIR / "05_scheduled"
-PUBLISHED_DIR = BASE_DIR / "06_published"
+BULK_WORKERS = 8
+
+# Photo formats shown in the UI
+PHOTO_EXTS = (".jpg", ".jpeg", ".png")
+
+# Rejected posts are renamed here, then deleted off the request thread
+TRASH_DIR = BASE_DIR / ".trash"
+_DELETE_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+
+def _discard_dir(path):
+    """Move a folder into TRASH_DIR and delete it in the background."""
+    tomb = TRASH_DIR / uuid.uuid4().hex
+    os.replace(path, tomb)
+    _DELETE_EXECUTOR.submit(shutil.rmtree, str(tomb), ignore_errors=True)
+
+
+def _sweep_trash():
+    """Delete folders left in TRASH_DIR by a previous run."""
+    for entry in iter_subdirs(TRASH_DIR):
+        _DELETE_EXECUTOR.submit(shutil.rmtree, entry.path, ignore_errors=True)
+
+
+# Create the stage folders once so endpoints can move posts without mkdir calls
+for _d in (DRAFTS_DIR, APPROVED_DIR, SCHEDULED_DIR, PUBLISHED_DIR, TRASH_DIR):
+    _d.mkdir(parents=True, exist_ok=True)
+_sweep_trash()
+
+
+# photos folder -> (mtime_ns, sorted photo names); small, oldest entries evicted
+_photo_list_cache = {}
+PHOTO_LIST_CACHE_SIZE = 64
 
 
 def _load_posts(directory, prefix="draft_"):
     """Load all post.json files from a directory."""
     posts = []
-    directory = Path(directory)
-    if not directory.exists():
-        return posts
-    for post_dir in sorted(directory.iterdir()):
-        if not post_dir.is_dir():
+    for entry in iter_subdirs(directory):
+        try:
+            data = load_json_cached(os.path.join(entry.path, "post.json"))
+        except FileNotFoundError:
             continue
-        post_json = post_dir / "post.json"
-        if post_json.exists():
-            with open(post_json, "r", encoding="utf-8") as f:
-                post = json.load(f)
-            post["_dir"] = str(post_dir)
-            posts.append(post)
+        post = dict(data)
+        post["_dir"] = entry.path
+        posts.append(post)
     return posts
 
 
+# post id -> post folder, filled by _rebuild_post_index() and updated in place
+# by the endpoints that move or delete posts. Entries are checked against
+# post.json on every hit, so any move missed here only costs a rebuild.
+_POST_INDEX = {}
+
+
+def _read_post_json(post_dir):
+    """Parse post_dir/post.json, or return None if it's missing."""
+    try:
+        return read_json(Path(post_dir) / "post.json")
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def _iter_all_post_dirs():
+    """Yield every post folder: drafts, approved, scheduled, then published/{year}/{month}."""
+    for stage_dir in [DRAFTS_DIR, APPROVED_DIR, SCHEDULED_DIR]:
+        for entry in iter_subdirs(stage_dir):
+            yield Path(entry.path)
+    for year_dir in iter_subdirs(PUBLISHED_DIR):
+        for month_dir in iter_subdirs(year_dir.path):
+            for entry in iter_subdirs(month_dir.path):
+                yield Path(entry.path)
+
+
+def _rebuild_post_index():
+    index = {}
+    for d in _iter_all_post_dirs():
+        data = _read_post_json(d)
+        if data is not None and data.get("id") is not None:
+            # Earlier stages win, as in the original search order
+            index.setdefault(data["id"], d)
+    _POST_INDEX.clear()
+    _POST_INDEX.update(index)
+
+
+def _conventional_post_dirs(post_id):
+    """Folders a post normally lives in: drafts are draft_<id>, later stages post_<id>."""
+    return (
+        DRAFTS_DIR / f"draft_{post_id}",
+        APPROVED_DIR / f"post_{post_id}",
+        SCHEDULED_DIR / f"post_{post_id}",
+    )
+
+
 def _find_post_dir(post_id):
     """Find the directory containing a post by its ID."""
-    # Check main stage directories
-    for stage_dir in [DRAFTS_DIR, APPROVED_DIR, SCHEDULED_DIR]:
-        if not stage_dir.exists():
-            continue
-        for d in stage_dir.iterdir():
-            if not d.is_dir():
-                continue
-            pj = d / "post.json"
-            if pj.exists():
-                with open(pj, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if data.get("id") == post_id:
-                    return d, data
-
-    # Check published directory (year/month structure)
-    if PUBLISHED_DIR.exists():
-        for year_dir in PUBLISHED_DIR.iterdir():
-            if not year_dir.is_dir():
-                continue
-            for month_dir in year_dir.iterdir():
-                if not month_dir.is_dir():
-                    continue
-                for d in month_dir.iterdir():
-                    if not d.is_dir():
-                        continue
-                    pj = d / "post.json"
-                    if pj.exists():
-                        with open(pj, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        if data.get("id") == post_id:
-                            return d, data
+    d = _POST_INDEX.get(post_id)
+    if d is not None:
+        data = _read_post_json(d)
+        if data is not None and data.get("id") == post_id:
+            return d, data
+
+    # Try the folder names the app itself uses before scanning anything
+    for d in _conventional_post_dirs(post_id):
+        data = _read_post_json(d)
+        if data is not None and data.get("id") == post_id:
+            _POST_INDEX[post_id] = d
+            return d, data
+
+    # Unknown or moved: rescan every stage once
+    _rebuild_post_index()
+    d = _POST_INDEX.get(post_id)
+    if d is not None:
+        data = _read_post_json(d)
+        if data is not None:
+            return d, data
     return None, None
 
 
+def _find_post_folder(post_id):
+    """Find the directory of a post by its ID without parsing its post.json.
+
+    For endpoints that only serve files from the folder. Index hits are
+    trusted as long as the folder still has a post.json.
+    """
+    d = _POST_INDEX.get(post_id)
+    if d is not None and os.path.isfile(os.path.join(d, "post.json")):
+        return d
+    for d in _conventional_post_dirs(post_id):
+        if os.path.isfile(os.path.join(d, "post.json")):
+            _POST_INDEX[post_id] = d
+            return d
+    _rebuild_post_index()
+    return _POST_INDEX.get(post_id)
+
+
 # --- Pages ---
 
 @app.route("/")
@@ -172,7 +268,7 @@ def classified_page():
                 city = city_dir.name
                 photos = []
                 for f in sorted(city_dir.iterdir()):
-                    if f.is_file() and f.suffix.lower() in (".jpg", ".jpeg", ".png"):
+                    if f.is_file() and f.name.lower().endswith(PHOTO_EXTS):
                         photos.append({
                             "filename": f.name,
                             "path": f"{country}/{city}/{f.name}"
@@ -258,8 +354,7 @@ def published_page():
                         continue
                     post_json = post_dir / "post.json"
                     if post_json.exists():
-                        with open(post_json, "r", encoding="utf-8") as f:
-                            post = json.load(f)
+                        post = read_json(post_json)
                         post["_dir"] = str(post_dir)
                         post["_year"] = year_dir.name
                         post["_month"] = month_dir.name
@@ -278,11 +373,8 @@ def api_status():
 @app.route("/api/classified/<path:photo_path>")
 def serve_classified_photo(photo_path):
     """Serve a classified photo."""
-    from flask import send_file
-    photo_file = CLASSIFIED_DIR / photo_path
-    if not photo_file.exists():
-        return "Not found", 404
-    return send_file(str(photo_file))
+    # send_from_directory rejects paths escaping the folder and 404s on missing files
+    return send_from_directory(CLASSIFIED_DIR, photo_path, conditional=True)
 
 
 @app.route("/api/classified/locations")
@@ -438,11 +530,11 @@ def save_settings():
     """Save settings and hashtags configuration."""
     body = request.get_json()
 
-    settings_path = BASE_DIR / "config" / "settings.json"
-    hashtags_path = BASE_DIR / "config" / "hashtags.json"
+    settings_path = CONFIG_DIR / "settings.json"
+    hashtags_path = CONFIG_DIR / "hashtags.json"
 
     # Load current settings to preserve fields not in the UI (paths, apis)
-    current_settings = load_settings()
+    current_settings = dict(load_settings())
 
     new_settings = body.get("settings", {})
     # Merge: keep paths and apis from current, update the rest
@@ -456,13 +548,12 @@ def save_settings():
     current_settings["carousel"] = new_settings.get("carousel", current_settings.get("carousel"))
 
     # Save settings
-    with open(settings_path, "w", encoding="utf-8") as f:
-        json.dump(current_settings, f, ensure_ascii=False, indent=2)
+    write_json(settings_path, current_settings)
 
     # Save hashtags
     new_hashtags = body.get("hashtags", {})
-    with open(hashtags_path, "w", encoding="utf-8") as f:
-        json.dump(new_hashtags, f, ensure_ascii=False, indent=2)
+    write_json(hashtags_path, new_hashtags)
+    clear_json_cache()
 
     return jsonify({"ok": True})
 
@@ -470,29 +561,34 @@ def save_settings():
 @app.route("/api/post/<post_id>/photos")
 def get_post_photos(post_id):
     """Serve photo list for a post."""
-    post_dir, data = _find_post_dir(post_id)
+    post_dir = _find_post_folder(post_id)
     if not post_dir:
         return jsonify({"error": "Post not found"}), 404
-    photos_dir = post_dir / "photos"
-    photos = []
-    if photos_dir.exists():
-        for f in sorted(photos_dir.iterdir()):
-            if f.is_file() and f.suffix.lower() in (".jpg", ".jpeg", ".png"):
-                photos.append(f.name)
-    return jsonify({"photos": photos, "post_id": post_id})
+    photos_dir = str(post_dir / "photos")
+    try:
+        mtime = os.stat(photos_dir).st_mtime_ns
+    except OSError:
+        return jsonify({"photos": [], "post_id": post_id})
+
+    # Adding, removing or renaming a photo bumps the folder's mtime
+    cached = _photo_list_cache.get(photos_dir)
+    if cached is None or cached[0] != mtime:
+        with os.scandir(photos_dir) as it:
+            photos = sorted(e.name for e in it if e.is_file() and e.name.lower().endswith(PHOTO_EXTS))
+        if len(_photo_list_cache) >= PHOTO_LIST_CACHE_SIZE:
+            _photo_list_cache.pop(next(iter(_photo_list_cache)))
+        cached = (mtime, photos)
+        _photo_list_cache[photos_dir] = cached
+    return jsonify({"photos": cached[1], "post_id": post_id})
 
 
 @app.route("/api/photo/<post_id>/<filename>")
 def serve_photo(post_id, filename):
     """Serve a photo file."""
-    post_dir, _ = _find_post_dir(post_id)
+    post_dir = _find_post_folder(post_id)
     if not post_dir:
         return "Not found", 404
-    photo_path = post_dir / "photos" / filename
-    if not photo_path.exists():
-        return "Not found", 404
-    from flask import send_file
-    return send_file(str(photo_path))
+    return send_from_directory(post_dir / "photos", filename, conditional=True)
 
 
 @app.route("/api/post/<post_id>/caption", methods=["POST"])
@@ -509,8 +605,7 @@ def update_caption(post_id):
     if "hashtags" in body:
         data["caption"]["hashtags"] = body["hashtags"]
 
-    with open(post_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(post_dir / "post.json", data)
 
     return jsonify({"ok": True})
 
@@ -550,8 +645,7 @@ def regenerate_caption(post_id):
         data["caption"]["generated_by"] = "claude-api"
         data["caption"]["edited"] = False
 
-        with open(post_dir / "post.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json(post_dir / "post.json", data)
 
         return jsonify({
             "ok": True,
@@ -588,6 +682,37 @@ def _return_photo_to_classified(photo_path, photo_entry, country, city):
     return True
 
 
+def _rename_photos(photos_dir, renames):
+    """Apply (old_name, new_name) renames inside photos_dir.
+
+    Each photo goes straight to its new name, unless that name still belongs
+    to a photo that hasn't been renamed yet; those go through a unique temp
+    name first. No scratch folder, one rename per photo in the common case.
+    Names are compared casefolded, since NTFS and APFS treat 01.jpg and
+    01.JPG as the same file.
+    """
+    pending = {old for old, _ in renames}
+    # Casefolded names of photos not renamed yet (a name can occur twice on Linux)
+    pending_folded = Counter(old.casefold() for old in pending)
+    token = uuid.uuid4().hex[:8]
+    deferred = []
+    for i, (old, new) in enumerate(renames):
+        if old not in pending:
+            continue  # Listed twice, already renamed
+        pending.discard(old)
+        pending_folded[old.casefold()] -= 1
+        if old == new:
+            continue
+        if pending_folded[new.casefold()] > 0:
+            tmp = photos_dir / f".tmp-{token}-{i:02d}{Path(new).suffix}"
+            os.replace(photos_dir / old, tmp)
+            deferred.append((tmp, photos_dir / new))
+        else:
+            os.replace(photos_dir / old, photos_dir / new)
+    for tmp, dest in deferred:
+        os.replace(tmp, dest)
+
+
 @app.route("/api/post/<post_id>/photo/<filename>", methods=["DELETE"])
 def delete_photo(post_id, filename):
     """Remove a photo from a post's carousel and return it to classified."""
@@ -612,27 +737,19 @@ def delete_photo(post_id, filename):
     data["photos"] = [p for p in data["photos"] if p["filename"] != filename]
 
     # Renumber remaining photos
-    temp_dir = post_dir / "_temp_renumber"
-    temp_dir.mkdir(exist_ok=True)
-
+    renames = []
     new_photo_entries = []
     for i, entry in enumerate(data["photos"], 1):
-        old_path = photos_dir / entry["filename"]
         new_name = f"{i:02d}.jpg"
-        if old_path.exists():
-            shutil.move(str(old_path), str(temp_dir / new_name))
+        if (photos_dir / entry["filename"]).exists():
+            renames.append((entry["filename"], new_name))
         entry = dict(entry)
         entry["filename"] = new_name
         new_photo_entries.append(entry)
-
-    # Move back
-    for f in temp_dir.iterdir():
-        shutil.move(str(f), str(photos_dir / f.name))
-    temp_dir.rmdir()
+    _rename_photos(photos_dir, renames)
 
     data["photos"] = new_photo_entries
-    with open(post_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(post_dir / "post.json", data)
 
     return jsonify({"ok": True, "remaining": len(new_photo_entries)})
 
@@ -648,21 +765,22 @@ def reorder_photos(post_id):
     new_order = body.get("order", [])  # list of filenames in new order
 
     photos_dir = post_dir / "photos"
-    temp_dir = post_dir / "_temp_reorder"
-    temp_dir.mkdir(exist_ok=True)
 
     # Build a lookup from current filename to photo entry
     entry_by_filename = {entry["filename"]: entry for entry in data["photos"]}
 
-    # Move to temp with new numbering
+    renames = []
+    queued = set()
     new_photo_entries = []
     for i, filename in enumerate(new_order, 1):
         src = photos_dir / filename
-        if not src.exists():
+        # A repeated name was already queued for its first position
+        if filename in queued or not src.exists():
             continue
+        queued.add(filename)
         ext = src.suffix
         new_name = f"{i:02d}{ext}"
-        shutil.move(str(src), str(temp_dir / new_name))
+        renames.append((filename, new_name))
 
         # Update photo entry
         entry = entry_by_filename.get(filename)
@@ -671,14 +789,10 @@ def reorder_photos(post_id):
             entry["filename"] = new_name
             new_photo_entries.append(entry)
 
-    # Move back
-    for f in temp_dir.iterdir():
-        shutil.move(str(f), str(photos_dir / f.name))
-    temp_dir.rmdir()
+    _rename_photos(photos_dir, renames)
 
     data["photos"] = new_photo_entries
-    with open(post_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(post_dir / "post.json", data)
 
     return jsonify({"ok": True})
 
@@ -694,11 +808,10 @@ def approve_post(post_id):
     data["meta"]["approved_at"] = datetime.now().isoformat()
 
     dest = APPROVED_DIR / f"post_{post_id}"
-    APPROVED_DIR.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(post_dir), str(dest))
+    move_path(post_dir, dest)
+    _POST_INDEX[post_id] = dest
 
-    with open(dest / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(dest / "post.json", data)
 
     return jsonify({"ok": True, "status": "approved"})
 
@@ -711,8 +824,7 @@ def unapprove_post(post_id):
         return jsonify({"error": "Post not found in approved"}), 404
 
     post_json = post_dir / "post.json"
-    with open(post_json, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_json(post_json)
 
     # Update status back to draft
     data["status"] = "draft"
@@ -720,11 +832,10 @@ def unapprove_post(post_id):
 
     # Move back to drafts
     dest = DRAFTS_DIR / f"draft_{post_id}"
-    DRAFTS_DIR.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(post_dir), str(dest))
+    move_path(post_dir, dest)
+    _POST_INDEX[post_id] = dest
 
-    with open(dest / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(dest / "post.json", data)
 
     return jsonify({"ok": True, "status": "draft"})
 
@@ -748,8 +859,10 @@ def reject_post(post_id):
             if _return_photo_to_classified(photo_path, photo_entry, country, city):
                 returned += 1
 
-    # Now remove the empty draft directory
-    shutil.rmtree(str(post_dir))
+    # Now remove the draft directory: rename it out of the stages right away,
+    # delete it in the background
+    _discard_dir(post_dir)
+    _POST_INDEX.pop(post_id, None)
     return jsonify({"ok": True, "status": "rejected", "photos_returned": returned})
 
 
@@ -827,30 +940,22 @@ def split_post(post_id):
         },
     }
 
-    with open(new_draft_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(new_post_data, f, ensure_ascii=False, indent=2)
+    write_json(new_draft_dir / "post.json", new_post_data)
 
     # Update original post - renumber remaining photos
-    temp_dir = post_dir / "_temp_split"
-    temp_dir.mkdir(exist_ok=True)
-
+    renames = []
     updated_entries = []
     for i, entry in enumerate(first_part, 1):
-        old_path = photos_dir / entry["filename"]
         new_name = f"{i:02d}.jpg"
-        if old_path.exists():
-            shutil.move(str(old_path), str(temp_dir / new_name))
+        if (photos_dir / entry["filename"]).exists():
+            renames.append((entry["filename"], new_name))
         new_entry = dict(entry)
         new_entry["filename"] = new_name
         updated_entries.append(new_entry)
-
-    for f in temp_dir.iterdir():
-        shutil.move(str(f), str(photos_dir / f.name))
-    temp_dir.rmdir()
+    _rename_photos(photos_dir, renames)
 
     data["photos"] = updated_entries
-    with open(post_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(post_dir / "post.json", data)
 
     return jsonify({
         "ok": True,
@@ -933,30 +1038,22 @@ def split_post_select(post_id):
         },
     }
 
-    with open(new_draft_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(new_post_data, f, ensure_ascii=False, indent=2)
+    write_json(new_draft_dir / "post.json", new_post_data)
 
     # Renumber remaining photos in original post
-    temp_dir = post_dir / "_temp_split"
-    temp_dir.mkdir(exist_ok=True)
-
+    renames = []
     updated_entries = []
     for i, entry in enumerate(keep_photos, 1):
-        old_path = photos_dir / entry["filename"]
         new_name = f"{i:02d}.jpg"
-        if old_path.exists():
-            shutil.move(str(old_path), str(temp_dir / new_name))
+        if (photos_dir / entry["filename"]).exists():
+            renames.append((entry["filename"], new_name))
         new_entry = dict(entry)
         new_entry["filename"] = new_name
         updated_entries.append(new_entry)
-
-    for f in temp_dir.iterdir():
-        shutil.move(str(f), str(photos_dir / f.name))
-    temp_dir.rmdir()
+    _rename_photos(photos_dir, renames)
 
     data["photos"] = updated_entries
-    with open(post_dir / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(post_dir / "post.json", data)
 
     return jsonify({
         "ok": True,
@@ -966,30 +1063,39 @@ def split_post_select(post_id):
     })
 
 
+def _move_and_write_post(post_dir, dest, data):
+    move_path(post_dir, dest)
+    write_json(dest / "post.json", data)
+    _POST_INDEX[data["id"]] = dest
+
+
 @app.route("/api/posts/approve-bulk", methods=["POST"])
 def approve_bulk():
     """Approve multiple posts at once."""
     body = request.get_json()
     post_ids = body.get("post_ids", [])
+
+    # Resolve every id first, then move the folders on a pool
+    approved_at = datetime.now().isoformat()
     results = []
+    tasks = []
+    seen = set()
     for pid in post_ids:
-        post_dir, data = _find_post_dir(pid)
+        post_dir, data = (None, None) if pid in seen else _find_post_dir(pid)
+        seen.add(pid)
         if not post_dir or data.get("status") != "draft":
             results.append({"id": pid, "ok": False})
             continue
 
         data["status"] = "approved"
-        data["meta"]["approved_at"] = datetime.now().isoformat()
-
-        dest = APPROVED_DIR / f"post_{pid}"
-        APPROVED_DIR.mkdir(parents=True, exist_ok=True)
-        shutil.move(str(post_dir), str(dest))
-
-        with open(dest / "post.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
+        data["meta"]["approved_at"] = approved_at
+        tasks.append((post_dir, APPROVED_DIR / f"post_{pid}", data))
         results.append({"id": pid, "ok": True})
 
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(BULK_WORKERS, len(tasks))) as ex:
+            list(ex.map(lambda t: _move_and_write_post(*t), tasks))
+
     return jsonify({"results": results})
 
 
@@ -1032,8 +1138,7 @@ def confirm_schedule_custom():
             continue
 
         post_json = post_dir / "post.json"
-        with open(post_json, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_json(post_json)
 
         # Update schedule
         scheduled_at = f"{scheduled_date}T{scheduled_time}:00"
@@ -1046,12 +1151,11 @@ def confirm_schedule_custom():
             data["photos"] = _upload_photos_to_cloudinary(post_dir, data["photos"])
 
         # Move to scheduled
-        SCHEDULED_DIR.mkdir(parents=True, exist_ok=True)
         dest = SCHEDULED_DIR / post_dir.name
-        shutil.move(str(post_dir), str(dest))
+        move_path(post_dir, dest)
+        _POST_INDEX[post_id] = dest
 
-        with open(dest / "post.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json(dest / "post.json", data)
 
         scheduled_count += 1
 
@@ -1078,19 +1182,17 @@ def publish_now(post_id):
         return jsonify({"error": "Post not found in approved"}), 404
 
     post_json = post_dir / "post.json"
-    with open(post_json, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_json(post_json)
 
     # Move to scheduled first
-    SCHEDULED_DIR.mkdir(parents=True, exist_ok=True)
     scheduled_path = SCHEDULED_DIR / post_dir.name
-    shutil.move(str(post_dir), str(scheduled_path))
+    move_path(post_dir, scheduled_path)
+    _POST_INDEX[post_id] = scheduled_path
 
     # Update status
     data["status"] = "scheduled"
     data["schedule"]["scheduled_at"] = datetime.now().isoformat()
-    with open(scheduled_path / "post.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(scheduled_path / "post.json", data)
 
     # Now publish
     try: